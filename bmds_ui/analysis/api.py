@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.http import FileResponse
 from rest_framework import exceptions, mixins, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -16,7 +17,7 @@ from ..common.utils import get_bool
 from ..common.validation import pydantic_validate
 from . import models, schema, serializers, validators
 from .reporting.cache import DocxReportCache, ExcelReportCache
-from .reporting.docx import add_update_url, build_polyk_docx, build_raoscott_docx
+from .reporting.docx import build_polyk_docx, build_raoscott_docx
 
 
 class AnalysisViewset(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
@@ -66,7 +67,7 @@ class AnalysisViewset(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
         except ValidationError as err:
             raise exceptions.ValidationError(err.message) from None
 
-        instance.reset_execution()
+        instance.reset_execution(retain=True)
         instance.inputs = data
         instance.save()
 
@@ -91,7 +92,7 @@ class AnalysisViewset(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
             return Response("Execution already started", status=400)
 
         # start analysis execution
-        instance.reset_execution()
+        instance.reset_execution(retain=True)
         instance.start_execute()
 
         instance.refresh_from_db()
@@ -114,10 +115,8 @@ class AnalysisViewset(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
         selection = pydantic_validate(data, validators.AnalysisSelectedSchema)
         instance.update_selection(selection)
 
-        # fetch from db and get the latest
-        instance.refresh_from_db()
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        # return the updated selection, without loading other sessions
+        return Response(selection.model_dump(by_alias=True))
 
     @action(detail=True, methods=("post",), url_path="execute-reset")
     def execute_reset(self, request, *args, **kwargs):
@@ -148,35 +147,51 @@ class AnalysisViewset(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
         cache = ExcelReportCache(analysis=instance)
         response = cache.request_content()
         if response.status is ReportStatus.COMPLETE:
-            cache.delete()  # destroy from cache; request is now complete
-            data = renderers.BinaryFile(data=response.content, filename=instance.slug)
-            return Response(data)
+            # stream the file from the report store
+            return FileResponse(
+                response.content,
+                as_attachment=True,
+                filename=f"{instance.slug}.xlsx",
+                content_type=renderers.XlsxRenderer.media_type,
+            )
 
         return Response(response.model_dump(), content_type="application/json")
 
+    @action(detail=True, renderer_classes=renderers.TABLE_RENDERERS)
+    def tables(self, request, *args, **kwargs):
+        """
+        Return summary, dataset, and parameter tables for the selected analysis; either all tables
+        as a zip of CSV files (`?format=zip`), or a single table as Parquet
+        (`?format=parquet&table=summary`).
+        """
+        instance = self.get_object()
+        data = instance.to_df()
+        if request.accepted_renderer.format == "parquet" and "error" not in data:
+            table = request.query_params.get("table", "summary")
+            if table not in data:
+                raise exceptions.ValidationError({"table": f"Must be one of {list(data)}"})
+            data = {table: data[table]}
+        return Response(renderers.DataFrames(data=data, filename=instance.slug))
+
     @action(detail=True, renderer_classes=(renderers.DocxRenderer,))
     def word(self, request, *args, **kwargs):
         """
         Return Word report for the selected analysis
         """
         instance: models.Analysis = self.get_object()
-        uri = request.build_absolute_uri("/")[:-1]
-        kwargs = {
-            "dataset_format_long": get_bool(request.query_params.get("datasetFormatLong")),
-            "all_models": get_bool(request.query_params.get("allModels")),
-            "bmd_cdf_table": get_bool(request.query_params.get("bmdCdfTable")),
-        }
-        cache = DocxReportCache(analysis=instance, uri=uri, **kwargs)
+        options = instance.docx_options(
+            dataset_format_long=get_bool(request.query_params.get("datasetFormatLong")),
+            all_models=get_bool(request.query_params.get("allModels")),
+            bmd_cdf_table=get_bool(request.query_params.get("bmdCdfTable")),
+            # editors get a separate report variant, with a link to update the analysis; the edit
+            # key is sent in a header so it is not saved in request logs
+            edit=instance.password == request.headers.get("X-Edit-Key", ""),
+        )
+        cache = DocxReportCache(analysis=instance, **options)
         response = cache.request_content()
         if response.status is ReportStatus.COMPLETE:
-            cache.delete()  # destroy from cache; request is now complete
-            edit = instance.password == request.query_params.get("editKey", "")
-            data = (
-                add_update_url(instance, response.content, uri)
-                if edit and not settings.IS_DESKTOP
-                else response.content
-            )
-            return Response(renderers.BinaryFile(data=data, filename=instance.slug))
+            data = renderers.BinaryFile(data=response.content, filename=instance.slug)
+            return Response(data)
 
         return Response(response.model_dump(), content_type="application/json")
 
@@ -5,4 +5,10 @@ class Config(AppConfig):
     name = "bmds_ui.analysis"
 
     def ready(self):
+        from django.conf import settings
+
         from . import signals  # noqa
+        from .codec import check_codec
+
+        # fail at startup instead of when results are first saved
+        check_codec(settings.ANALYSIS_OUTPUT_CODEC)
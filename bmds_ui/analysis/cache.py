@@ -0,0 +1,82 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+
+from pybmds.utils import get_version
+
+from .schema import AnalysisSessionSchema
+
+RESULT_CACHE_ALIAS = "results"
+
+
+def get_session_key(inputs: dict, dataset_index: int, option_index: int) -> str:
+    """Return a content-addressed key for a single dataset/option-set combination.
+
+    The key is a hash of all inputs which can change the results of the session, including the
+    version of pybmds and bmdscore; the names and positions of items in the analysis are not
+    considered. A multitumor session (dataset_index=-1) uses all enabled datasets.
+
+    Args:
+        inputs (dict): The analysis inputs
+        dataset_index (int): The dataset index, or -1 for a multitumor session
+        option_index (int): The option set index
+
+    Returns:
+        str: A sha256 hex digest
+    """
+    if dataset_index == -1:
+        enabled = [i for i, opts in enumerate(inputs["dataset_options"]) if opts["enabled"]]
+        datasets = [inputs["datasets"][i] for i in enabled]
+        dataset_options = [inputs["dataset_options"][i] for i in enabled]
+    else:
+        datasets = inputs["datasets"][dataset_index]
+        dataset_options = inputs["dataset_options"][dataset_index]
+    version = get_version()
+    content = {
+        "dataset_type": inputs["dataset_type"],
+        "datasets": datasets,
+        "dataset_options": dataset_options,
+        "options": inputs["options"][option_index],
+        "models": inputs["models"],
+        "recommender": inputs.get("recommender"),
+        "version": [version.python, version.dll],
+    }
+    data = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+class ResultCache:
+    """A cache of successfully executed sessions, shared across all analyses.
+
+    Enabled if a `results` cache is configured in `settings.CACHES`; otherwise all methods are
+    a no-op. Eviction is handled by the cache backend.
+    """
+
+    def __init__(self, inputs: dict):
+        self.inputs = inputs
+        self.cache = caches[RESULT_CACHE_ALIAS] if self.enabled() else None
+
+    @classmethod
+    def enabled(cls) -> bool:
+        return RESULT_CACHE_ALIAS in settings.CACHES
+
+    def key(self, dataset_index: int, option_index: int) -> str:
+        return f"result-{get_session_key(self.inputs, dataset_index, option_index)}"
+
+    def get(self, dataset_index: int, option_index: int) -> AnalysisSessionSchema | None:
+        if self.cache is None:
+            return None
+        data = self.cache.get(self.key(dataset_index, option_index))
+        if data is None:
+            return None
+        return AnalysisSessionSchema.model_validate(data).model_copy(
+            update=dict(dataset_index=dataset_index, option_index=option_index, cached=True)
+        )
+
+    def set(self, output: AnalysisSessionSchema):
+        if self.cache is None or output.error:
+            return
+        key = self.key(output.dataset_index, output.option_index)
+        self.cache.set(key, output.model_dump(by_alias=True, exclude={"cached"}))
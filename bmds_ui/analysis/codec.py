@@ -0,0 +1,63 @@
+import json
+import zlib
+
+from django.core.exceptions import ImproperlyConfigured
+
+# codecs used to encode serialized sessions; an empty string stores uncompressed JSON
+CODECS = ("", "zlib", "zstd")
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImproperlyConfigured(
+            "The `zstandard` package is required for the zstd codec."
+        ) from None
+    return zstandard
+
+
+def check_codec(codec: str):
+    if codec not in CODECS:
+        raise ImproperlyConfigured(f"Unknown codec: {codec!r}; must be one of {CODECS}")
+    if codec == "zstd":
+        _zstd()
+
+
+def encode(data: dict, codec: str) -> bytes:
+    """Encode data as compact JSON, compressed using the codec.
+
+    Args:
+        data (dict): JSON serializable data
+        codec (str): A compression codec; `zlib` or `zstd`
+
+    Returns:
+        bytes: The encoded data
+    """
+    check_codec(codec)
+    value = json.dumps(data, separators=(",", ":")).encode()
+    if codec == "zlib":
+        return zlib.compress(value)
+    if codec == "zstd":
+        return _zstd().ZstdCompressor().compress(value)
+    raise ValueError("A codec is required")
+
+
+def decode(value: bytes, codec: str) -> dict:
+    """Decode data previously encoded with the codec.
+
+    Args:
+        value (bytes): The encoded data
+        codec (str): A compression codec; `zlib` or `zstd`
+
+    Returns:
+        dict: The decoded data
+    """
+    value = bytes(value)
+    if codec == "zlib":
+        value = zlib.decompress(value)
+    elif codec == "zstd":
+        value = _zstd().ZstdDecompressor().decompress(value)
+    else:
+        raise ValueError(f"Unknown codec: {codec!r}")
+    return json.loads(value)
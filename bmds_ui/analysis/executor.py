@@ -171,6 +171,10 @@ class AnalysisSession(NamedTuple):
     def to_dict(self) -> dict:
         return self.to_schema().model_dump(by_alias=True)
 
+    def batch_sessions(self) -> list[Session]:
+        """The pybmds sessions, in the same order as in a batch."""
+        return [session for session in (self.frequentist, self.bayesian) if session]
+
 
 class MultiTumorSession(NamedTuple):
     """
@@ -223,10 +227,24 @@ class MultiTumorSession(NamedTuple):
     def to_dict(self) -> dict:
         return self.to_schema().model_dump(by_alias=True)
 
+    def batch_sessions(self) -> list[pybmds.Multitumor]:
+        """The pybmds sessions, in the same order as in a batch."""
+        return [self.session]
+
 
 AllSession = AnalysisSession | MultiTumorSession
 
 
+def run(inputs: dict, dataset_index: int, option_index: int) -> AnalysisSessionSchema:
+    """Execute a single dataset/option-set combination.
+
+    A multitumor session executes all enabled datasets; the dataset_index is ignored.
+    """
+    if inputs["dataset_type"] == ModelClass.MULTI_TUMOR:
+        return MultiTumorSession.run(inputs, option_index)
+    return AnalysisSession.run(inputs, dataset_index, option_index)
+
+
 def deserialize(model_class: ModelClass, data: dict) -> AllSession:
     Runner = MultiTumorSession if model_class is ModelClass.MULTI_TUMOR else AnalysisSession
     return Runner.deserialize(data)
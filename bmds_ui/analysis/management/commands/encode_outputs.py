@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ...codec import CODECS, check_codec
+from ...models import AnalysisSessionOutput
+
+
+class Command(BaseCommand):
+    help = """Re-encode saved session outputs using a storage codec."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--codec",
+            dest="codec",
+            default=None,
+            help=f"Codec {CODECS}; defaults to the ANALYSIS_OUTPUT_CODEC setting",
+        )
+        parser.add_argument(
+            "--batch-size",
+            dest="batch_size",
+            type=int,
+            default=500,
+            help="Number of rows to update per transaction",
+        )
+
+    def handle(self, *args, **options):
+        codec = settings.ANALYSIS_OUTPUT_CODEC if options["codec"] is None else options["codec"]
+        try:
+            check_codec(codec)
+        except ImproperlyConfigured as err:
+            raise CommandError(str(err)) from None
+
+        batch_size = options["batch_size"]
+        qs = AnalysisSessionOutput.objects.exclude(codec=codec).order_by("id")
+        last_id = 0
+        n_updated = 0
+        while True:
+            with transaction.atomic():
+                batch = list(qs.filter(id__gt=last_id)[:batch_size])
+                if not batch:
+                    break
+                for session_output in batch:
+                    session_output.set_data(session_output.get_data(), codec)
+                AnalysisSessionOutput.objects.bulk_update(batch, ["data", "codec", "encoded"])
+            last_id = batch[-1].id
+            n_updated += len(batch)
+            self.stdout.write(self.style.HTTP_INFO(f"{n_updated} rows updated..."))
+
+        self.stdout.write(self.style.SUCCESS(f"Re-encoding complete; {n_updated} rows updated."))
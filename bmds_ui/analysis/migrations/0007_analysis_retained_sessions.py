@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("analysis", "0006_alter_collection_options"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="analysis",
+            name="retained_sessions",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
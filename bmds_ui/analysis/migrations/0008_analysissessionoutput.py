@@ -0,0 +1,72 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def move_sessions(apps, schema_editor):
+    # move sessions saved inline in Analysis.outputs to AnalysisSessionOutput
+    Analysis = apps.get_model("analysis", "Analysis")
+    AnalysisSessionOutput = apps.get_model("analysis", "AnalysisSessionOutput")
+    qs = Analysis.objects.filter(outputs__outputs__isnull=False).only("id", "outputs")
+    for analysis in qs.iterator(chunk_size=100):
+        sessions = analysis.outputs.pop("outputs")
+        AnalysisSessionOutput.objects.bulk_create(
+            AnalysisSessionOutput(
+                analysis_id=analysis.id,
+                dataset_index=session["dataset_index"],
+                option_index=session["option_index"],
+                data=session,
+            )
+            for session in sessions
+        )
+        analysis.save(update_fields=["outputs"])
+
+
+def restore_sessions(apps, schema_editor):
+    Analysis = apps.get_model("analysis", "Analysis")
+    AnalysisSessionOutput = apps.get_model("analysis", "AnalysisSessionOutput")
+    analysis_ids = AnalysisSessionOutput.objects.values_list("analysis_id", flat=True).distinct()
+    for analysis in Analysis.objects.filter(id__in=analysis_ids).only("id", "outputs").iterator():
+        qs = AnalysisSessionOutput.objects.filter(analysis_id=analysis.id)
+        analysis.outputs["outputs"] = list(qs.values_list("data", flat=True))
+        analysis.save(update_fields=["outputs"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("analysis", "0007_analysis_retained_sessions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AnalysisSessionOutput",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("dataset_index", models.IntegerField()),
+                ("option_index", models.IntegerField()),
+                ("data", models.JSONField(default=dict)),
+                (
+                    "analysis",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="session_outputs",
+                        to="analysis.analysis",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("dataset_index", "option_index"),
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("analysis", "dataset_index", "option_index"),
+                        name="unique_analysis_session_output",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(move_sessions, reverse_code=restore_sessions),
+    ]
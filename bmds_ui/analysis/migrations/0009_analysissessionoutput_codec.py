@@ -0,0 +1,34 @@
+from django.db import migrations, models
+
+from ..codec import decode
+
+
+def decode_sessions(apps, schema_editor):
+    # restore encoded sessions as uncompressed JSON before the encoded column is removed
+    AnalysisSessionOutput = apps.get_model("analysis", "AnalysisSessionOutput")
+    qs = AnalysisSessionOutput.objects.exclude(codec="").only("id", "codec", "encoded")
+    for session_output in qs.iterator(chunk_size=100):
+        session_output.data = decode(session_output.encoded, session_output.codec)
+        session_output.codec = ""
+        session_output.encoded = None
+        session_output.save(update_fields=["data", "codec", "encoded"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("analysis", "0008_analysissessionoutput"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="analysissessionoutput",
+            name="codec",
+            field=models.CharField(blank=True, max_length=8),
+        ),
+        migrations.AddField(
+            model_name="analysissessionoutput",
+            name="encoded",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(migrations.RunPython.noop, reverse_code=decode_sessions),
+    ]
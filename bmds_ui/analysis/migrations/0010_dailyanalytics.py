@@ -0,0 +1,38 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("analysis", "0009_analysissessionoutput_codec"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyAnalytics",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("date", models.DateField(unique=True)),
+                ("n_created", models.PositiveIntegerField(default=0)),
+                ("n_completed", models.PositiveIntegerField(default=0)),
+                ("dataset_options", models.JSONField(default=dict)),
+                ("dtypes", models.JSONField(default=dict)),
+                ("dichotomous_models", models.JSONField(default=dict)),
+                ("updated", models.DateTimeField()),
+            ],
+            options={
+                "verbose_name_plural": "Daily analytics",
+                "ordering": ("date",),
+                "get_latest_by": ("date",),
+            },
+        ),
+        migrations.AlterField(
+            model_name="analysis",
+            name="last_updated",
+            field=models.DateTimeField(auto_now=True, db_index=True, null=True),
+        ),
+    ]
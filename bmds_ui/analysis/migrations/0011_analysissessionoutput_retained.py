@@ -0,0 +1,34 @@
+from django.db import migrations, models
+
+
+def clear_retained_sessions(apps, schema_editor):
+    # retained sessions were saved inline; they are now kept as session output rows
+    Analysis = apps.get_model("analysis", "Analysis")
+    Analysis.objects.exclude(retained_sessions={}).update(retained_sessions={})
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("analysis", "0010_dailyanalytics"),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_retained_sessions, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name="analysissessionoutput",
+            name="unique_analysis_session_output",
+        ),
+        migrations.AddField(
+            model_name="analysissessionoutput",
+            name="retained",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddConstraint(
+            model_name="analysissessionoutput",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("retained", False)),
+                fields=("analysis", "dataset_index", "option_index"),
+                name="unique_analysis_session_output",
+            ),
+        ),
+    ]
@@ -1,30 +1,42 @@
+import datetime as dt
 import logging
+import queue
 import traceback
 import uuid
+from collections import Counter
+from collections.abc import Iterator
 from copy import deepcopy
 from datetime import datetime, timedelta
+from functools import partial
 from io import BytesIO
+from pathlib import Path
+from typing import Self
 
+import billiard
 import pandas as pd
 import reversion
 from django.conf import settings
 from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
-from django.db import DataError, models
+from django.db import DataError, models, transaction
 from django.db.models.functions import Lower
 from django.urls import reverse
 from django.utils.text import slugify
 from django.utils.timezone import now
 
-import pybmds
 from pybmds.batch import BatchBase, BatchSession, MultitumorBatch
 from pybmds.constants import ModelClass
+from pybmds.models.multi_tumor import Multitumor
 from pybmds.recommender.recommender import RecommenderSettings
 
 from .. import __version__
+from ..common.db import JSONSet
+from ..common.retention import delete_in_batches
 from ..common.utils import random_string
-from . import constants, tasks, validators
+from . import constants, executor, tasks, validators
+from .cache import ResultCache, get_session_key
+from .codec import decode, encode
 from .executor import AnalysisSession, MultiTumorSession, Session, deserialize
 from .reporting import excel
 from .reporting.cache import DocxReportCache, ExcelReportCache
@@ -43,15 +55,16 @@ def get_deletion_date(current_deletion_date: datetime | None = None) -> datetime
     return date
 
 
-@reversion.register()
+@reversion.register(exclude=settings.ANALYSIS_REVISION_EXCLUDE, ignore_duplicates=True)
 class Analysis(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     password = models.CharField(max_length=12, default=random_string, editable=False)
     inputs = models.JSONField(default=dict)
     outputs = models.JSONField(default=dict, blank=True)
+    retained_sessions = models.JSONField(default=dict, blank=True)
     errors = models.JSONField(default=dict, blank=True)
     created = models.DateTimeField(auto_now_add=True)
-    last_updated = models.DateTimeField(null=True, auto_now=True)
+    last_updated = models.DateTimeField(null=True, auto_now=True, db_index=True)
     started = models.DateTimeField(null=True, blank=True)
     ended = models.DateTimeField(null=True, blank=True)
     deletion_date = models.DateTimeField(null=True, blank=True, default=get_deletion_date)
@@ -145,27 +158,32 @@ class Analysis(models.Model):
     def has_errors(self):
         return len(self.errors) > 0
 
+    @property
+    def progress(self) -> dict:
+        """The number of sessions completed and the total number of sessions to execute."""
+        total = len(self.get_combinations()) if self.started else 0
+        if "outputs" in self.outputs:
+            return {"completed": len(self.outputs["outputs"]), "total": total}
+        return {"completed": self.session_outputs.count(), "total": total}
+
     @classmethod
-    def delete_old_analyses(cls):
+    def delete_old_analyses(cls) -> int:
         qs = cls.objects.filter(deletion_date__lt=now())
-        logger.info(f"Removing {qs.count()} old BMDS analysis")
-        qs.delete()
+        return delete_in_batches(qs, "old BMDS analyses")
 
     @classmethod
-    def delete_unexecuted_analyses(cls):
+    def delete_unexecuted_analyses(cls) -> int:
         delete_before = now() - timedelta(days=settings.DAYS_TO_KEEP_UNEXECUTED_ANALYSES)
         qs = cls.objects.filter(created__lt=delete_before, started__isnull=True)
-        logger.info(f"Removing {qs.count()} unexecuted analysis created before {delete_before}")
-        qs.delete()
+        return delete_in_batches(qs, f"unexecuted analyses created before {delete_before}")
 
     @classmethod
-    def delete_unnamed_clones(cls):
+    def delete_unnamed_clones(cls) -> int:
         delete_before = now() - timedelta(days=settings.DAYS_TO_KEEP_UNNAMED_CLONES)
         qs = cls.objects.filter(
             created__lt=delete_before, inputs__analysis_name__startswith=" (clone)"
         )
-        logger.info(f"Removing {qs.count()} analyses with '(clone)' names")
-        qs.delete()
+        return delete_in_batches(qs, "analyses with '(clone)' names")
 
     @classmethod
     def maybe_hanging(cls, queryset):
@@ -182,31 +200,74 @@ class Analysis(models.Model):
     def model_class_label(self) -> str:
         return constants.model_types[self.inputs["dataset_type"]]
 
+    def iter_session_outputs(self) -> Iterator[dict]:
+        """Yield the serialized outputs of each session, in combination order.
+
+        Sessions are loaded from the database one at a time; each item is a new object which can
+        be modified by the caller.
+        """
+        if "outputs" in self.outputs:
+            # saved inline, prior to AnalysisSessionOutput
+            for output in self.outputs["outputs"]:
+                yield deepcopy(output)
+            return
+        for session_output in self.session_outputs.iterator(chunk_size=10):
+            yield session_output.get_data()
+
+    def get_session_outputs(self) -> list[dict]:
+        """Return the serialized outputs of each session, in combination order."""
+        return list(self.iter_session_outputs())
+
+    def get_outputs(self) -> dict:
+        """Return outputs in the same format as `AnalysisOutput`, including all sessions."""
+        if "outputs" in self.outputs:
+            return self.outputs
+        sessions = self.get_session_outputs()
+        if not self.outputs and not sessions:
+            return {}
+        return {**self.outputs, "outputs": sessions}
+
+    def move_inline_outputs(self):
+        """Move sessions saved inline in `outputs` into AnalysisSessionOutput; instance not saved."""
+        if "outputs" not in self.outputs:
+            return
+        sessions = self.outputs.pop("outputs")
+        self.session_outputs.all().delete()
+        AnalysisSessionOutput.objects.bulk_create(
+            AnalysisSessionOutput(
+                analysis=self,
+                dataset_index=session["dataset_index"],
+                option_index=session["option_index"],
+                **AnalysisSessionOutput.encode_data(session),
+            )
+            for session in sessions
+        )
+
     def get_session(self, index: int) -> Session:
         if not self.is_finished or self.has_errors:
             raise ValueError("Session cannot be returned")
-        return deserialize(self.model_class, deepcopy(self.outputs["outputs"][index]))
+        if "outputs" in self.outputs:
+            return deserialize(self.model_class, deepcopy(self.outputs["outputs"][index]))
+        return deserialize(self.model_class, self.session_outputs.all()[index].get_data())
 
-    def get_sessions(self) -> list[Session]:
+    def iter_sessions(self) -> Iterator[Session]:
+        """Return an iterator of sessions, which are deserialized as they are iterated."""
         if not self.is_finished or self.has_errors:
             raise ValueError("Session cannot be returned")
-        return [
-            deserialize(self.model_class, output) for output in deepcopy(self.outputs["outputs"])
-        ]
+        return (deserialize(self.model_class, output) for output in self.iter_session_outputs())
 
-    def to_batch(self) -> BatchBase:
-        # convert list[AnalysisSession] to list[pybmds.Session]
-        items = []
-        sessions = self.get_sessions()
+    def get_sessions(self) -> list[Session]:
+        return list(self.iter_sessions())
 
-        if self.model_class == ModelClass.MULTI_TUMOR:
-            return MultitumorBatch(session.session for session in sessions)
+    def iter_batch_sessions(self) -> Iterator[Session | Multitumor]:
+        """Yield pybmds sessions, in the same order as in `to_batch`."""
+        for session in self.iter_sessions():
+            yield from session.batch_sessions()
 
-        for session in sessions:
-            if session.frequentist:
-                items.append(session.frequentist)
-            if session.bayesian:
-                items.append(session.bayesian)
+    def to_batch(self) -> BatchBase:
+        items = list(self.iter_batch_sessions())
+        if self.model_class == ModelClass.MULTI_TUMOR:
+            return MultitumorBatch(items)
         return BatchSession(sessions=items)
 
     def to_df(self) -> dict[str, pd.DataFrame]:
@@ -219,20 +280,10 @@ class Analysis(models.Model):
                 ).to_frame(),
             }
 
-        sessions = self.get_sessions()
-
+        sessions = self.iter_sessions()
         if self.model_class == ModelClass.MULTI_TUMOR:
-            return {
-                "summary": excel.multitumor_summary_df(sessions),
-                "datasets": excel.multitumor_dataset_df(sessions),
-                "parameters": excel.multitumor_params_df(sessions),
-            }
-
-        return {
-            "summary": excel.summary_df(sessions),
-            "datasets": excel.dataset_df(sessions),
-            "parameters": excel.params_df(sessions),
-        }
+            return excel.multitumor_dfs(sessions)
+        return excel.session_dfs(sessions)
 
     def to_excel(self) -> BytesIO:
         f = BytesIO()
@@ -242,22 +293,55 @@ class Analysis(models.Model):
                 df.to_excel(writer, sheet_name=name, index=False)
         return f
 
+    def write_excel(self, path: Path):
+        """Write an Excel export to a file, a session at a time, using constant memory.
+
+        Args:
+            path (Path): The output file
+        """
+        if not self.is_finished or self.has_errors:
+            sheets = ((name, df.to_dict("records")) for name, df in self.to_df().items())
+        elif self.model_class == ModelClass.MULTI_TUMOR:
+            sheets = (
+                (name, df.to_dict("records"))
+                for name, df in excel.multitumor_frames(self.iter_sessions())
+            )
+        else:
+            sheets = excel.session_rows(self.iter_sessions())
+        excel.write_xlsx(path, sheets, fill={"summary": "-"})
+
     def update_selection(self, selection: validators.AnalysisSelectedSchema):
-        """Given a new selection data schema; update outputs and save instance
+        """Given a new selection data schema; update the selection of a single session.
+
+        Only the selection in the session is updated; the analysis is not saved, so no revision
+        is created, but report caches are cleared.
 
         Args:
             selection (validators.AnalysisSelectedSchema): The selection to update
         """
-        for idx, output in enumerate(self.outputs["outputs"]):
-            if (
-                output["dataset_index"] == selection.dataset_index
-                and output["option_index"] == selection.option_index
-            ):
-                session = self.get_session(idx)
-                session.frequentist.selected = selection.selected.deserialize(session)
-                self.outputs["outputs"][idx] = session.to_dict()
-                self.save()
-                break
+        if not self.is_finished or self.has_errors:
+            raise ValueError("Session cannot be returned")
+        if "outputs" in self.outputs:
+            self.move_inline_outputs()
+            self.save()
+        qs = self.session_outputs.filter(
+            dataset_index=selection.dataset_index, option_index=selection.option_index
+        )
+        selected = selection.selected.model_dump(by_alias=True)
+        path = ("frequentist", "selected")
+        if qs.filter(codec="").update(data=JSONSet("data", path, selected)) == 0:
+            # encoded sessions must be rewritten
+            session_output = qs.first()
+            data = session_output.get_data() if session_output else {}
+            if not data.get("frequentist"):
+                return
+            data["frequentist"]["selected"] = selected
+            session_output.set_data(data, session_output.codec)
+            session_output.save()
+        self.last_updated = now()
+        Analysis.objects.filter(id=self.id).update(last_updated=self.last_updated)
+        DocxReportCache(analysis=self).delete()
+        ExcelReportCache(analysis=self).delete()
 
     def try_execute(self):
         try:
@@ -266,17 +350,65 @@ class Analysis(models.Model):
             err = traceback.format_exc()
             self.handle_execution_error(err)
 
+    def _session_error(self, dataset_index: int, option_index: int) -> AnalysisSessionSchema:
+        # must be called from an exception handler
+        response = AnalysisSessionSchema(
+            dataset_index=dataset_index, option_index=option_index, error=traceback.format_exc()
+        )
+        logger.error(f"{self.id}: {response}")
+        return response
+
     def try_run_session(
         self, inputs: dict, dataset_index: int, option_index: int
     ) -> AnalysisSessionSchema:
         try:
             return AnalysisSession.run(inputs, dataset_index, option_index)
         except Exception:
+            return self._session_error(dataset_index, option_index)
+
+    def try_run_sessions_parallel(
+        self, inputs: dict, combinations: list[tuple[int, int]], max_workers: int
+    ) -> Iterator[AnalysisSessionSchema]:
+        """Execute each combination in a process pool; results are yielded as they complete.
+
+        A billiard pool is used, which can be started from a daemonic process such as a celery
+        prefork worker; if a pool cannot be started, combinations are executed serially.
+
+        Args:
+            inputs (dict): The analysis inputs
+            combinations (list[tuple[int, int]]): A list of (dataset_index, option_index)
+            max_workers (int): The maximum number of processes
+
+        Yields:
+            AnalysisSessionSchema: Results in the order they complete
+        """
+        try:
+            pool = billiard.Pool(processes=min(max_workers, len(combinations)))
+        except Exception:
+            logger.exception("Cannot start a process pool; executing serially")
+            for combination in combinations:
+                yield self.try_run_combination(*combination)
+            return
+
+        def on_error(dataset_index: int, option_index: int, exc: BaseException):
+            error = "".join(traceback.format_exception(exc))
             response = AnalysisSessionSchema(
-                dataset_index=dataset_index, option_index=option_index, error=traceback.format_exc()
+                dataset_index=dataset_index, option_index=option_index, error=error
             )
             logger.error(f"{self.id}: {response}")
-            return response
+            results.put(response)
+
+        results = queue.SimpleQueue()
+        with pool:
+            for dataset_index, option_index in combinations:
+                pool.apply_async(
+                    executor.run,
+                    (inputs, dataset_index, option_index),
+                    callback=results.put,
+                    error_callback=partial(on_error, dataset_index, option_index),
+                )
+            for _ in combinations:
+                yield results.get()
 
     def try_run_multitumor(self, inputs: dict, option_index: int) -> AnalysisSessionSchema:
         try:
@@ -288,6 +420,26 @@ class Analysis(models.Model):
             logger.error(f"{self.id}: {response}")
             return response
 
+    def get_combinations(self) -> list[tuple[int, int]]:
+        """Return the (dataset_index, option_index) combinations to be executed.
+
+        A multitumor analysis executes all datasets together, so the dataset_index is -1.
+        """
+        if self.model_class == ModelClass.MULTI_TUMOR:
+            return [(-1, option_index) for option_index in range(len(self.inputs["options"]))]
+        combinations = []
+        for dataset_index in range(len(self.inputs["datasets"])):
+            for option_index in range(len(self.inputs["options"])):
+                if self.inputs["dataset_options"][dataset_index]["enabled"]:
+                    combinations.append((dataset_index, option_index))
+        return combinations
+
+    def use_distributed_execution(self) -> bool:
+        return (
+            settings.ANALYSIS_DISTRIBUTED_EXECUTION
+            and len(self.get_combinations()) >= settings.ANALYSIS_DISTRIBUTED_MIN_SESSIONS
+        )
+
     def start_execute(self):
         # update model to indicate execution scheduled
         self.started = now()
@@ -295,37 +447,103 @@ class Analysis(models.Model):
         self.save()
 
         # add to analysis queue...
-        tasks.try_execute.delay(str(self.id))
+        if self.use_distributed_execution():
+            tasks.try_execute_distributed(str(self.id), self.get_combinations())
+        else:
+            tasks.try_execute.delay(str(self.id))
 
-    def _execute_session(self) -> list[AnalysisSessionSchema]:
-        # build combinations based on enabled datasets
-        combinations = []
-        for dataset_index in range(len(self.inputs["datasets"])):
-            for option_index in range(len(self.inputs["options"])):
-                if self.inputs["dataset_options"][dataset_index]["enabled"]:
-                    combinations.append((dataset_index, option_index))
+    def try_run_combination(self, dataset_index: int, option_index: int) -> AnalysisSessionSchema:
+        if self.model_class == ModelClass.MULTI_TUMOR:
+            return self.try_run_multitumor(self.inputs, option_index)
+        return self.try_run_session(self.inputs, dataset_index, option_index)
+
+    def get_retained_session(
+        self, dataset_index: int, option_index: int
+    ) -> AnalysisSessionSchema | None:
+        """Return a session retained from a previous execution, if its inputs are unchanged."""
+        pk = self.retained_sessions.get(get_session_key(self.inputs, dataset_index, option_index))
+        if pk is None:
+            return None
+        session_output = AnalysisSessionOutput.all_objects.filter(
+            pk=pk, analysis_id=self.id, retained=True
+        ).first()
+        data = session_output.get_data() if session_output else {}
+        if not data or data.get("error"):
+            return None
+        return AnalysisSessionSchema.model_validate(data).model_copy(
+            update=dict(dataset_index=dataset_index, option_index=option_index, cached=True)
+        )
 
-        return [
-            self.try_run_session(self.inputs, dataset_index, option_index)
-            for dataset_index, option_index in combinations
-        ]
+    def run_combinations(self, combinations: list[tuple[int, int]]) -> list[AnalysisSessionSchema]:
+        """Execute combinations, using previously cached results where available.
 
-    def _execute_multitumor(self) -> list[AnalysisSessionSchema]:
-        n_options = len(self.inputs["options"])
-        return [
-            self.try_run_multitumor(self.inputs, option_index) for option_index in range(n_options)
-        ]
+        Args:
+            combinations (list[tuple[int, int]]): A list of (dataset_index, option_index)
+
+        Returns:
+            list[AnalysisSessionSchema]: Results in the same order as combinations
+        """
+        cache = ResultCache(self.inputs)
+        outputs = {
+            combination: self.get_retained_session(*combination) or cache.get(*combination)
+            for combination in combinations
+        }
+        misses = [combination for combination, output in outputs.items() if output is None]
+        for output in outputs.values():
+            if output is not None:
+                self.save_session_output(output)
+
+        max_workers = settings.ANALYSIS_EXECUTION_WORKERS
+        if max_workers > 1 and len(misses) > 1:
+            responses = self.try_run_sessions_parallel(self.inputs, misses, max_workers)
+        else:
+            responses = (self.try_run_combination(*combination) for combination in misses)
+
+        for output in responses:
+            cache.set(output)
+            self.save_session_output(output)
+            outputs[(output.dataset_index, output.option_index)] = output
+
+        return [outputs[combination] for combination in combinations]
+
+    def save_session_output(self, output: AnalysisSessionSchema):
+        """Save a completed session to the database.
+
+        Sessions are saved as they complete so that progress and partial results are available
+        during execution.
+
+        Args:
+            output (AnalysisSessionSchema): A completed session
+        """
+        AnalysisSessionOutput.objects.update_or_create(
+            analysis_id=self.id,
+            dataset_index=output.dataset_index,
+            option_index=output.option_index,
+            defaults=AnalysisSessionOutput.encode_data(output.model_dump(by_alias=True)),
+        )
 
     def _execute(self) -> list[AnalysisSessionSchema]:
-        is_multitumor = self.inputs.get("dataset_type") == pybmds.constants.ModelClass.MULTI_TUMOR
-        if is_multitumor:
-            return self._execute_multitumor()
-        return self._execute_session()
+        return self.run_combinations(self.get_combinations())
 
     def execute(self):
         # update start time to actual time started
         self.started = now()
         outputs = self._execute()
+        self.finish_execution(outputs)
+
+    def try_finish_execution(self, outputs: list[AnalysisSessionSchema]):
+        try:
+            self.finish_execution(outputs)
+        except Exception:
+            err = traceback.format_exc()
+            self.handle_execution_error(err)
+
+    def finish_execution(self, outputs: list[AnalysisSessionSchema]):
+        """Save the outputs of all sessions and mark execution complete.
+
+        Args:
+            outputs (list[AnalysisSessionSchema]): Session outputs, in combination order
+        """
         # get bmds version
         bmds_python_version = None
         for output in outputs:
@@ -335,28 +553,75 @@ class Analysis(models.Model):
             if output.bayesian is not None:
                 bmds_python_version = output.bayesian["version"]
                 break
-        # get prepare complete output object
+        # get prepare complete output object; sessions are saved separately
         analysis_output = AnalysisOutput(
             analysis_id=str(self.id),
             bmds_ui_version=__version__,
             bmds_python_version=bmds_python_version,
-            outputs=[output.model_dump(by_alias=True) for output in outputs],
+            outputs=[],
+        )
+        self.outputs = analysis_output.model_dump(by_alias=True, exclude={"outputs"})
+        saved = set(self.session_outputs.values_list("dataset_index", "option_index"))
+        AnalysisSessionOutput.objects.bulk_create(
+            AnalysisSessionOutput(
+                analysis=self,
+                dataset_index=output.dataset_index,
+                option_index=output.option_index,
+                **AnalysisSessionOutput.encode_data(output.model_dump(by_alias=True)),
+            )
+            for output in outputs
+            if (output.dataset_index, output.option_index) not in saved
         )
-        self.outputs = analysis_output.model_dump(by_alias=True)
         self.errors = [output.error for output in outputs if output.error]
+        self.delete_retained_sessions()
         self.ended = now()
         self.deletion_date = get_deletion_date()
         self.save()
+        if settings.ANALYSIS_PREGENERATE_REPORTS and not self.has_errors:
+            transaction.on_commit(partial(tasks.start_pregenerate_reports, str(self.id)))
+
+    def retain_sessions(self):
+        """
+        Retain executed sessions for reuse in the next execution if their inputs are unchanged.
+
+        Session rows are kept, but hidden from the current results; `retained_sessions` maps a key
+        of the current inputs for each session to its row.
+        """
+        self.move_inline_outputs()
+        qs = self.session_outputs.all()
+        rows = list(qs.values_list("id", "dataset_index", "option_index"))
+        if not rows:
+            # keep sessions from a prior execution; the analysis has not been re-executed
+            return
+        self.delete_retained_sessions()
+        qs.update(retained=True)
+        self.retained_sessions = {
+            get_session_key(self.inputs, dataset_index, option_index): pk
+            for pk, dataset_index, option_index in rows
+        }
 
-    def reset_execution(self):
+    def delete_retained_sessions(self):
+        AnalysisSessionOutput.all_objects.filter(analysis_id=self.id, retained=True).delete()
+        self.retained_sessions = {}
+
+    def reset_execution(self, retain: bool = False):
         """
         Update all modeling results and execution fields to a state where the analysis
         has not yet been executed.
+
+        Args:
+            retain (bool): If True and incremental execution is enabled, retain successful
+                sessions for reuse in the next execution; must be called before inputs are changed.
         """
+        if retain and settings.ANALYSIS_INCREMENTAL_EXECUTION:
+            self.retain_sessions()
+        else:
+            self.delete_retained_sessions()
         self.started = None
         self.ended = None
         self.outputs = {}
         self.errors = {}
+        self.session_outputs.all().delete()
 
     def handle_execution_error(self, err):
         self.errors = err
@@ -364,6 +629,31 @@ class Analysis(models.Model):
         self.deletion_date = None  # don't delete; save for troubleshooting
         self.save()
 
+    def docx_options(
+        self,
+        dataset_format_long: bool | None = None,
+        all_models: bool = False,
+        bmd_cdf_table: bool = False,
+        edit: bool = False,
+    ) -> dict:
+        """Word report options; defaults are the same as the user interface.
+
+        Reports are cached and stored by their options, so the API and report pregeneration both
+        use this method to request the same report variants.
+        """
+        if dataset_format_long is None:
+            dataset_format_long = self.model_class not in (
+                ModelClass.MULTI_TUMOR,
+                ModelClass.NESTED_DICHOTOMOUS,
+            )
+        return {
+            "uri": settings.WEBSITE_URI,
+            "dataset_format_long": dataset_format_long,
+            "all_models": all_models,
+            "bmd_cdf_table": bmd_cdf_table,
+            "edit": edit and not settings.IS_DESKTOP,
+        }
+
     def default_input(self) -> dict:
         return {
             "dataset_type": ModelClass.CONTINUOUS,
@@ -394,6 +684,144 @@ class Analysis(models.Model):
         return self.last_updated or self.ended or self.created
 
 
+class SessionOutputManager(models.Manager):
+    def get_queryset(self):
+        # sessions retained for reuse in the next execution are not part of the current results
+        return super().get_queryset().filter(retained=False)
+
+
+class AnalysisSessionOutput(models.Model):
+    analysis = models.ForeignKey(Analysis, on_delete=models.CASCADE, related_name="session_outputs")
+    dataset_index = models.IntegerField()
+    option_index = models.IntegerField()
+    data = models.JSONField(default=dict)
+    codec = models.CharField(max_length=8, blank=True)
+    encoded = models.BinaryField(null=True, blank=True)
+    retained = models.BooleanField(default=False)
+
+    objects = SessionOutputManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        ordering = ("dataset_index", "option_index")
+        constraints = (
+            models.UniqueConstraint(
+                fields=("analysis", "dataset_index", "option_index"),
+                condition=models.Q(retained=False),
+                name="unique_analysis_session_output",
+            ),
+        )
+
+    def __str__(self):
+        return f"{self.analysis_id}: {self.dataset_index}/{self.option_index}"
+
+    @classmethod
+    def encode_data(cls, data: dict, codec: str | None = None) -> dict:
+        """Return field values to store session data, encoded using a codec.
+
+        Args:
+            data (dict): The serialized session
+            codec (str | None): The codec; defaults to `settings.ANALYSIS_OUTPUT_CODEC`
+
+        Returns:
+            dict: Values for the `data`, `codec`, and `encoded` fields
+        """
+        if codec is None:
+            codec = settings.ANALYSIS_OUTPUT_CODEC
+        if codec == "":
+            return {"data": data, "codec": "", "encoded": None}
+        return {"data": {}, "codec": codec, "encoded": encode(data, codec)}
+
+    def get_data(self) -> dict:
+        if self.codec:
+            return decode(self.encoded, self.codec)
+        return self.data
+
+    def set_data(self, data: dict, codec: str | None = None):
+        for key, value in self.encode_data(data, codec).items():
+            setattr(self, key, value)
+
+
+class DailyAnalytics(models.Model):
+    """A daily rollup of analyses created, for usage analytics.
+
+    Rows are updated incrementally, for days with analyses created or changed since the last
+    update, so analytics do not require scanning the analysis table. A day is summarized from the
+    analyses which exist when it is updated.
+    """
+
+    date = models.DateField(unique=True)
+    n_created = models.PositiveIntegerField(default=0)
+    n_completed = models.PositiveIntegerField(default=0)
+    # counts of completed analyses, keyed by "{n_datasets},{n_options}"
+    dataset_options = models.JSONField(default=dict)
+    # counts of datasets in completed analyses, keyed by dataset type
+    dtypes = models.JSONField(default=dict)
+    # counts of completed dichotomous analyses, keyed by "{frequentist},{bayesian}" (yes/no)
+    dichotomous_models = models.JSONField(default=dict)
+    updated = models.DateTimeField()
+
+    class Meta:
+        verbose_name_plural = "Daily analytics"
+        ordering = ("date",)
+        get_latest_by = ("date",)
+
+    def __str__(self):
+        return str(self.date)
+
+    @classmethod
+    def update_all(cls) -> int:
+        """Update rows for days with analyses created or changed since the last update.
+
+        Returns:
+            int: The number of days updated
+        """
+        started = now()
+        last = cls.objects.aggregate(last=models.Max("updated"))["last"]
+        qs = Analysis.objects.all()
+        if last:
+            qs = qs.filter(last_updated__gte=last)
+        days = list(qs.dates("created", "day"))
+        for day in days:
+            cls.update_day(day, started)
+        return len(days)
+
+    @classmethod
+    def update_day(cls, day: dt.date, updated: datetime) -> Self:
+        qs = Analysis.objects.filter(created__date=day)
+        completed = qs.filter(ended__isnull=False, outputs__analysis_id__isnull=False)
+        dataset_options = Counter()
+        dtypes = Counter()
+        dichotomous_models = Counter()
+        n_completed = 0
+        for inputs in completed.values_list("inputs", flat=True).iterator():
+            n_completed += 1
+            datasets = inputs["datasets"]
+            dataset_options[f"{len(datasets)},{len(inputs['options'])}"] += 1
+            dtypes.update(dataset["dtype"] for dataset in datasets)
+            if datasets[0]["dtype"] == "D":
+                model_inputs = inputs["models"]
+                has_frequentist = (
+                    len(model_inputs.get("frequentist_restricted", [])) > 0
+                    or len(model_inputs.get("frequentist_unrestricted", [])) > 0
+                )
+                has_bayesian = len(model_inputs.get("bayesian", [])) > 0
+                yes_no = {True: "yes", False: "no"}
+                dichotomous_models[f"{yes_no[has_frequentist]},{yes_no[has_bayesian]}"] += 1
+        obj, _ = cls.objects.update_or_create(
+            date=day,
+            defaults=dict(
+                n_created=qs.count(),
+                n_completed=n_completed,
+                dataset_options=dict(dataset_options),
+                dtypes=dict(dtypes),
+                dichotomous_models=dict(dichotomous_models),
+                updated=updated,
+            ),
+        )
+        return obj
+
+
 @reversion.register()
 class Collection(models.Model):
     name = models.CharField(max_length=128)
@@ -1,27 +1,33 @@
 from collections import Counter
+from collections.abc import Callable
 
 import pandas as pd
 import plotly.express as px
 from django.conf import settings
-from django.db.models import BooleanField, Count, ExpressionWrapper, F, Q
-from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.db.models import F
+from plotly.graph_objects import Figure
 
 from ...common.figures import punchcard
 from ...common.utils import timeout_cache
-from ..models import Analysis
+from ..models import Analysis, DailyAnalytics
 
 
-def time_series() -> dict:
+def daily_df() -> pd.DataFrame:
+    df = pd.DataFrame(
+        data=DailyAnalytics.objects.values_list("date", "n_created", "n_completed"),
+        columns=["day", "count", "n_completed"],
+    )
+    df["day"] = pd.to_datetime(df["day"])
+    df["week"] = df.day - pd.to_timedelta(df.day.dt.weekday, unit="D")
+    df["month"] = df.day.dt.to_period("M").dt.start_time
+    return df
+
+
+def time_series(daily: pd.DataFrame) -> dict:
     stats = {}
 
     # per day
-    df = pd.DataFrame(
-        data=Analysis.objects.annotate(day=TruncDay("created"))
-        .values("day")
-        .order_by("day")
-        .annotate(count=Count("id"))
-        .values("day", "count")
-    )
+    df = daily[["day", "count"]]
 
     # per day line chart
     fig = px.line(df, x="day", y="count", title="Analyses created per day", markers=True)
@@ -33,45 +39,31 @@ def time_series() -> dict:
     stats["fig_punchcard"] = fig
 
     # per week
-    df = pd.DataFrame(
-        data=Analysis.objects.annotate(week=TruncWeek("created"))
-        .values("week")
-        .order_by("week")
-        .annotate(count=Count("id"))
-        .values("week", "count")
-    )
+    df = daily.groupby("week", as_index=False)["count"].sum()
     fig = px.line(df, x="week", y="count", title="Analyses created per week", markers=True)
     stats["fig_per_week"] = fig
 
     # per month
-    df = pd.DataFrame(
-        data=Analysis.objects.annotate(month=TruncMonth("created"))
-        .values("month")
-        .order_by("month")
-        .annotate(count=Count("id"))
-        .values("month", "count")
-    )
+    df = daily.groupby("month", as_index=False)["count"].sum()
     fig = px.bar(df, x="month", y="count", title="Analyses created per month", text_auto=True)
     stats["fig_per_month"] = fig
     return stats
 
 
-def successes() -> dict:
+def completions(daily: pd.DataFrame, period: str) -> pd.DataFrame:
+    df = daily.groupby(period)[["count", "n_completed"]].sum()
+    df = pd.DataFrame(
+        {"completed": df.n_completed, "not completed": df["count"] - df.n_completed}
+    ).reset_index()
+    df = df.melt(id_vars=period, var_name="completed", value_name="count")
+    return df[df["count"] > 0].sort_values(period)
+
+
+def successes(daily: pd.DataFrame) -> dict:
     stats = {}
 
     # completions per week
-    completed_filter = ExpressionWrapper(
-        Q(ended__isnull=False) & Q(outputs__outputs__isnull=False), output_field=BooleanField()
-    )
-    df = pd.DataFrame(
-        data=Analysis.objects.annotate(completed=completed_filter)
-        .annotate(week=TruncWeek("created"))
-        .values("week", "completed")
-        .order_by("week")
-        .annotate(count=Count("id"))
-        .values("week", "completed", "count")
-    )
-    df["completed"] = df.completed.map({True: "completed", False: "not completed"})
+    df = completions(daily, "week")
     fig = px.bar(
         df,
         x="week",
@@ -83,18 +75,7 @@ def successes() -> dict:
     )
     stats["fig_completions_per_week"] = fig
 
-    completed_filter = ExpressionWrapper(
-        Q(ended__isnull=False) & Q(outputs__outputs__isnull=False), output_field=BooleanField()
-    )
-    df = pd.DataFrame(
-        data=Analysis.objects.annotate(completed=completed_filter)
-        .annotate(month=TruncMonth("created"))
-        .values("month", "completed")
-        .order_by("month")
-        .annotate(count=Count("id"))
-        .values("month", "completed", "count")
-    )
-    df["completed"] = df.completed.map({True: "completed", False: "not completed"})
+    df = completions(daily, "month")
     fig = px.bar(
         df,
         x="month",
@@ -113,30 +94,18 @@ def datasets() -> dict:
     stats = {}
 
     # dataset count by option set
-    completed_filter = ExpressionWrapper(
-        Q(ended__isnull=False) & Q(outputs__outputs__isnull=False), output_field=BooleanField()
-    )
-    completed_qs = Analysis.objects.annotate(completed=completed_filter).filter(completed=True)
     mappings = Counter()
     data_types = Counter()
     model_classes = Counter()
-    for analysis in completed_qs.only("inputs").iterator():
-        mappings[(len(analysis.inputs["datasets"]), len(analysis.inputs["options"]))] += 1
-        data_types.update([dataset["dtype"] for dataset in analysis.inputs["datasets"]])
-        first_ds = analysis.inputs["datasets"][0]["dtype"]
-        if first_ds == "D":
-            has_frequentist = (
-                len(analysis.inputs["models"].get("frequentist_restricted", [])) > 0
-                or len(analysis.inputs["models"].get("frequentist_unrestricted", [])) > 0
-            )
-            has_bayesian = len(analysis.inputs["models"].get("bayesian", [])) > 0
-            model_classes[(has_frequentist, has_bayesian)] += 1
+    for row in DailyAnalytics.objects.values("dataset_options", "dtypes", "dichotomous_models"):
+        mappings.update(row["dataset_options"])
+        data_types.update(row["dtypes"])
+        model_classes.update(row["dichotomous_models"])
 
     df = pd.DataFrame(
-        data=[(ds, os, count) for (ds, os), count in mappings.items()],
+        data=[(*map(int, key.split(",")), count) for key, count in mappings.items()],
         columns=["n_dataset", "n_options", "count"],
     )
-    df.head()
 
     fig = px.imshow(
         df.pivot_table(index="n_dataset", columns=["n_options"], values=["count"])
@@ -163,13 +132,9 @@ def datasets() -> dict:
 
     # cross tab
     df = pd.DataFrame(
-        data=[(freq, bayes, count) for (freq, bayes), count in model_classes.items()],
+        data=[(*key.split(","), count) for key, count in model_classes.items()],
         columns=["frequentist", "bayesian", "counts"],
     )
-    df = df.assign(
-        frequentist=df.frequentist.map({True: "yes", False: "no"}),
-        bayesian=df.bayesian.map({True: "yes", False: "no"}),
-    )
     ct = (
         pd.crosstab(
             df.frequentist,
@@ -208,14 +173,12 @@ def runtime() -> dict:
     return stats
 
 
-def get_analytics() -> dict:
-    n_total = Analysis.objects.count()
-    first_date = Analysis.objects.earliest("created").created.date()
-    last_date = Analysis.objects.latest("created").created.date()
+def summary(daily: pd.DataFrame) -> dict:
+    n_total = int(daily["count"].sum())
+    first_date = DailyAnalytics.objects.earliest().date
+    last_date = DailyAnalytics.objects.latest().date
     n_days = (last_date - first_date).days + 1
-    n_completed = Analysis.objects.filter(
-        ended__isnull=False, outputs__outputs__isnull=False
-    ).count()
+    n_completed = int(daily.n_completed.sum())
     return dict(
         first_date=first_date,
         last_date=last_date,
@@ -225,13 +188,33 @@ def get_analytics() -> dict:
         n_completed=n_completed,
         fraction_completed=n_completed / n_total * 100,
         n_completed_per_day=n_completed / n_days,
-        time_series=time_series(),
-        successes=successes(),
-        datasets=datasets(),
-        runtime=runtime(),
     )
 
 
-@timeout_cache("func-get_analytics", 10 if settings.DEBUG else 3600)
-def get_cached_analytics():
-    return get_analytics()
+PANELS: dict[str, Callable[[], dict]] = {
+    "summary": lambda: summary(daily_df()),
+    "time_series": lambda: time_series(daily_df()),
+    "successes": lambda: successes(daily_df()),
+    "datasets": datasets,
+    "runtime": runtime,
+}
+
+
+def get_panel(name: str) -> dict:
+    """Compute a panel of the analytics page; figures are serialized to JSON for caching.
+
+    Daily rollups are updated by a periodic task, not when a panel is computed.
+
+    Args:
+        name (str): A key in `PANELS`
+    """
+    data = PANELS[name]()
+    return {
+        key: value.to_json() if isinstance(value, Figure) else value for key, value in data.items()
+    }
+
+
+# stale analytics are served for up to a day while they are refreshed by a celery task
+@timeout_cache("func-analytics-panel", 10 if settings.DEBUG else 3600, hard_timeout=60 * 60 * 24)
+def get_cached_panel(name: str) -> dict:
+    return get_panel(name)
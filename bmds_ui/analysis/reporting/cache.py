@@ -1,18 +1,27 @@
 from io import BytesIO
+from pathlib import Path
 
 from ...common.task_cache import ReportCache
 from .. import tasks
 from .docx import build_docx
+from .figures import FigureCache
 
 
 class ExcelReportCache(ReportCache):
     cache_prefix = "excel"
+    stream = True
 
     def invoke_celery_task(self):
         return tasks.generate_excel.delay(str(self.analysis.id))
 
-    def create(self) -> BytesIO:
-        return self.analysis.to_excel()
+    def create(self) -> Path:
+        path = self.store.temporary_path()
+        try:
+            self.analysis.write_excel(path)
+        except Exception:
+            path.unlink(missing_ok=True)
+            raise
+        return path
 
 
 class DocxReportCache(ReportCache):
@@ -22,4 +31,4 @@ class DocxReportCache(ReportCache):
         return tasks.generate_report.delay(str(self.analysis.id), **self.kw)
 
     def create(self) -> BytesIO:
-        return build_docx(self.analysis, **self.kw)
+        return build_docx(self.analysis, figure_cache=FigureCache.build_default(), **self.kw)
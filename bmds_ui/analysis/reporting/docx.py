@@ -1,9 +1,9 @@
 from __future__ import annotations
 
+from contextlib import nullcontext
 from io import BytesIO
 from typing import TYPE_CHECKING
 
-import docx
 from django.conf import settings
 from django.utils.timezone import now
 
@@ -16,6 +16,7 @@ from ... import __version__ as bmds_ui_version
 from ...common.docx import add_url_hyperlink
 from ...common.utils import to_timestamp
 from ..utils import get_citation
+from .figures import FigureCache
 
 if TYPE_CHECKING:
     from ..models import Analysis
@@ -35,6 +36,8 @@ def build_docx(
     dataset_format_long: bool = True,
     all_models: bool = False,
     bmd_cdf_table: bool = False,
+    edit: bool = False,
+    figure_cache: FigureCache | None = None,
 ) -> BytesIO:
     """Generate a Microsoft Word binary file for an analysis
 
@@ -44,6 +47,8 @@ def build_docx(
         dataset_format_long (bool, default True): long or wide dataset table format
         all_models (bool, default False):  Show all models, not just selected
         bmd_cdf_table (bool, default False): Export BMD CDF table
+        edit (bool, default False): Include a link to update the analysis, for editors
+        figure_cache (FigureCache, optional): Reuse figures rendered for other reports
 
     Returns:
         BytesIO: A word document byte stream
@@ -62,8 +67,10 @@ def build_docx(
     if not settings.IS_DESKTOP:
         p = report.document.add_paragraph()
         p.add_run(ANALYSIS_URL).bold = True
-        uri += analysis.get_absolute_url()
-        add_url_hyperlink(p, uri, "View")
+        add_url_hyperlink(p, uri + analysis.get_absolute_url(), "View")
+        if edit:
+            p.add_run(" / ")
+            add_url_hyperlink(p, uri + analysis.get_edit_url(), "Update")
 
     write_version_p(
         report,
@@ -77,16 +84,20 @@ def build_docx(
     elif analysis.has_errors:
         report.document.add_paragraph("Execution generated errors; no report can be generated")
     else:
-        batch = analysis.to_batch()
-        batch.to_docx(
-            report=report,
-            header_level=1,
-            citation=False,
+        options = dict(
             dataset_format_long=dataset_format_long,
             all_models=all_models,
             bmd_cdf_table=bmd_cdf_table,
             session_inputs_table=True,
         )
+        with figure_cache.activate() if figure_cache else nullcontext():
+            if figure_cache:
+                figure_cache.prerender(analysis, options)
+            # write sessions as they are deserialized; only one session is loaded at a time
+            for session in analysis.iter_batch_sessions():
+                session.to_docx(report, header_level=1, citation=False, **options)
+        if figure_cache:
+            figure_cache.store.evict()
 
     write_citation(report, 1)
 
@@ -105,30 +116,6 @@ def write_citation(report: Report, header_level: int):
     report.document.add_paragraph(get_citation(), styles.fixed_width)
 
 
-def add_update_url(analysis: Analysis, data: BytesIO, uri: str) -> BytesIO:
-    """Add an update URL to an existing BMDS report
-
-    Args:
-        analysis (Analysis): An Analysis object
-        data (BytesIO):  A word document byte stream
-        uri (str): The root URI for this site, eg: "https://example.com"
-
-    Returns:
-        BytesIO: A word document byte stream
-    """
-    document = docx.Document(data)
-    for p in document.paragraphs:
-        if p.text.startswith(ANALYSIS_URL):
-            p.add_run(" / ")
-            uri += analysis.get_edit_url()
-            add_url_hyperlink(p, uri, "Update")
-            break
-
-    f = BytesIO()
-    document.save(f)
-    return f
-
-
 def write_current_version_p(report):
     versions = get_version()
     write_version_p(report, bmds_ui_version, versions.python, versions.dll)
@@ -1,8 +1,16 @@
 from __future__ import annotations
 
+import math
+import pickle
+import tempfile
+from collections.abc import Iterable, Iterator
+from pathlib import Path
 from typing import Any
 
 import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
 
 from pybmds.constants import Dtype
 from pybmds.session import Session
@@ -48,17 +56,76 @@ def add_session(
         models.append(d)
 
 
-def summary_df(sessions: list[AnalysisSession]) -> pd.DataFrame:
-    dataset_data: dict[int, dict] = {}
-    model_data = []
+def add_dataset(datasets: dict[int, dict], rows: list[dict], session: AnalysisSession) -> None:
+    # add a summary record and data rows for each dataset, the first time it is used
+    if session.dataset_index in datasets:
+        return
+    dataset = (session.frequentist or session.bayesian).dataset
+    d = dict(dataset_index=session.dataset_index)
+    dataset.update_record(d)
+    datasets[session.dataset_index] = d
+    rows.extend(dataset.rows(extras=dict(dataset_index=session.dataset_index)))
+
 
+def add_params(rows: list[dict], session: AnalysisSession) -> None:
+    if session.frequentist:
+        for model_index, model in enumerate(session.frequentist.models):
+            if model.has_results:
+                if session.frequentist.dataset.dtype == Dtype.NESTED_DICHOTOMOUS:
+                    rows.extend(
+                        model.results.parameter_rows(
+                            extras=dict(
+                                dataset_index=session.dataset_index,
+                                option_index=session.option_index,
+                                model_index=model_index,
+                                model_name=model.name(),
+                            )
+                        )
+                    )
+                else:
+                    rows.extend(
+                        model.results.parameters.rows(
+                            extras=dict(
+                                dataset_index=session.dataset_index,
+                                option_index=session.option_index,
+                                analysis_type="frequentist",
+                                model_index=model_index,
+                                model_name=model.name(),
+                            )
+                        )
+                    )
+
+    if session.bayesian:
+        for model_index, model in enumerate(session.bayesian.models):
+            if model.has_results:
+                rows.extend(
+                    model.results.parameters.rows(
+                        extras=dict(
+                            dataset_index=session.dataset_index,
+                            option_index=session.option_index,
+                            analysis_type="bayesian",
+                            model_index=model_index,
+                            model_name=model.name(),
+                        )
+                    )
+                )
+
+
+def session_rows(sessions: Iterable[AnalysisSession]) -> Iterator[tuple[str, list[dict]]]:
+    """Yield rows for the summary, dataset, and parameter worksheets, one session at a time.
+
+    Args:
+        sessions (Iterable[AnalysisSession]): Sessions, which may be a lazy iterator
+
+    Yields:
+        tuple[str, list[dict]]: The worksheet name and rows
+    """
+    dataset_data: dict[int, dict] = {}
     for session in sessions:
-        if session.dataset_index not in dataset_data:
-            dataset = session.frequentist.dataset if session.frequentist else session.bayesian
-            d = dict(dataset_index=session.dataset_index)
-            dataset.update_record(d)
-            dataset_data[d["dataset_index"]] = d
+        dataset_rows: list[dict] = []
+        add_dataset(dataset_data, dataset_rows, session)
 
+        model_data: list[dict] = []
         if session.frequentist:
             add_session(
                 model_data,
@@ -75,90 +142,151 @@ def summary_df(sessions: list[AnalysisSession]) -> pd.DataFrame:
                 "bayesian",
                 session.bayesian,
             )
+        dataset = dataset_data[session.dataset_index]
+        yield "summary", [{**dataset, **d} for d in model_data]
+        yield "datasets", dataset_rows
 
-    df1 = pd.DataFrame(dataset_data.values())
-    df2 = pd.DataFrame(model_data)
-    df3 = df1.merge(df2, on="dataset_index").fillna("-")
-    return df3
+        param_rows: list[dict] = []
+        add_params(param_rows, session)
+        yield "parameters", param_rows
 
 
-def params_df(sessions: list[AnalysisSession]) -> pd.DataFrame:
-    data = []
-    for session in sessions:
-        if session.frequentist:
-            for model_index, model in enumerate(session.frequentist.models):
-                if model.has_results:
-                    if session.frequentist.dataset.dtype == Dtype.NESTED_DICHOTOMOUS:
-                        data.extend(
-                            model.results.parameter_rows(
-                                extras=dict(
-                                    dataset_index=session.dataset_index,
-                                    option_index=session.option_index,
-                                    model_index=model_index,
-                                    model_name=model.name(),
-                                )
-                            )
-                        )
-                    else:
-                        data.extend(
-                            model.results.parameters.rows(
-                                extras=dict(
-                                    dataset_index=session.dataset_index,
-                                    option_index=session.option_index,
-                                    analysis_type="frequentist",
-                                    model_index=model_index,
-                                    model_name=model.name(),
-                                )
-                            )
-                        )
+def session_dfs(sessions: Iterable[AnalysisSession]) -> dict[str, pd.DataFrame]:
+    """Return summary, dataset, and parameter dataframes; sessions are iterated once.
 
-        if session.bayesian:
-            for model_index, model in enumerate(session.bayesian.models):
-                if model.has_results:
-                    data.extend(
-                        model.results.parameters.rows(
-                            extras=dict(
-                                dataset_index=session.dataset_index,
-                                option_index=session.option_index,
-                                analysis_type="bayesian",
-                                model_index=model_index,
-                                model_name=model.name(),
-                            )
-                        )
-                    )
-    return pd.DataFrame(data=data)
+    Args:
+        sessions (Iterable[AnalysisSession]): Sessions, which may be a lazy iterator
 
+    Returns:
+        dict[str, pd.DataFrame]: Dataframes for each worksheet
+    """
+    rows: dict[str, list[dict]] = {"summary": [], "datasets": [], "parameters": []}
+    for name, items in session_rows(sessions):
+        rows[name].extend(items)
+    return {
+        "summary": pd.DataFrame(data=rows["summary"]).fillna("-"),
+        "datasets": pd.DataFrame(data=rows["datasets"]),
+        "parameters": pd.DataFrame(data=rows["parameters"]),
+    }
 
-def dataset_df(sessions: list[AnalysisSession]) -> pd.DataFrame:
-    data: list[dict] = []
-    datasets: set = set()
-    for session in sessions:
-        if session.dataset_index not in datasets:
-            dataset = session.frequentist.dataset if session.frequentist else session.bayesian
-            datasets.add(session.dataset_index)
-            data.extend(dataset.rows(extras=dict(dataset_index=session.dataset_index)))
-    return pd.DataFrame(data=data)
-
-
-def multitumor_summary_df(sessions: list[MultiTumorSession]) -> pd.DataFrame:
-    return pd.concat(
-        [
-            session.session.to_df(extras=dict(option_index=session.option_index))
-            for session in sessions
-        ]
-    )
-
-
-def multitumor_params_df(sessions: list[MultiTumorSession]) -> pd.DataFrame:
-    return pd.concat(
-        [
-            session.session.params_df(extras=dict(option_index=session.option_index))
-            for session in sessions
-        ]
-    )
-
-
-def multitumor_dataset_df(sessions: list[MultiTumorSession]) -> pd.DataFrame:
-    # if users run multiple option-sets, only print datasets first time
-    first = sessions[0].session
-    return first.datasets_df()
+
+def multitumor_frames(
+    sessions: Iterable[MultiTumorSession],
+) -> Iterator[tuple[str, pd.DataFrame]]:
+    """Yield dataframes for the summary, dataset, and parameter worksheets, one session at a time.
+
+    Args:
+        sessions (Iterable[MultiTumorSession]): Sessions, which may be a lazy iterator
+
+    Yields:
+        tuple[str, pd.DataFrame]: The worksheet name and dataframe
+    """
+    for i, session in enumerate(sessions):
+        # extras are modified in place, so each call gets a new dict
+        yield "summary", session.session.to_df(extras=dict(option_index=session.option_index))
+        # if users run multiple option-sets, only print datasets first time
+        if i == 0:
+            yield "datasets", session.session.datasets_df()
+        yield (
+            "parameters",
+            session.session.params_df(extras=dict(option_index=session.option_index)),
+        )
+
+
+def multitumor_dfs(sessions: Iterable[MultiTumorSession]) -> dict[str, pd.DataFrame]:
+    """Return summary, dataset, and parameter dataframes; sessions are iterated once.
+
+    Args:
+        sessions (Iterable[MultiTumorSession]): Sessions, which may be a lazy iterator
+
+    Returns:
+        dict[str, pd.DataFrame]: Dataframes for each worksheet
+    """
+    frames: dict[str, list[pd.DataFrame]] = {}
+    for name, df in multitumor_frames(sessions):
+        frames.setdefault(name, []).append(df)
+    return {name: pd.concat(dfs) for name, dfs in frames.items()}
+
+
+class SheetSpool:
+    """Rows for a worksheet, spooled to a temporary file as they are added.
+
+    Rows may have different keys; columns are the union of keys in the order first seen, which is
+    only known after all rows are added.
+    """
+
+    def __init__(self, name: str, fill: Any = None):
+        self.name = name
+        self.fill = fill
+        self.columns: dict[str, None] = {}
+        self.file = tempfile.TemporaryFile()
+
+    def extend(self, rows: Iterable[dict]):
+        for row in rows:
+            self.columns.update(dict.fromkeys(row))
+            pickle.dump(row, self.file)
+
+    def cell(self, value: Any) -> Any:
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return self.fill
+        if isinstance(value, float) and math.isinf(value):
+            return "inf" if value > 0 else "-inf"
+        return value
+
+    def rows(self) -> Iterator[list]:
+        self.file.seek(0)
+        while True:
+            try:
+                row = pickle.load(self.file)  # noqa: S301
+            except EOFError:
+                return
+            yield [self.cell(row.get(column)) for column in self.columns]
+
+    def close(self):
+        self.file.close()
+
+
+def write_xlsx(
+    path: Path, sheets: Iterable[tuple[str, list[dict]]], fill: dict[str, Any] | None = None
+):
+    """Write worksheets to an xlsx file using constant memory.
+
+    Rows are spooled to temporary files as they are generated and then streamed to a write-only
+    workbook, so the complete worksheets are never held in memory.
+
+    Args:
+        path (Path): The output file
+        sheets (Iterable[tuple[str, list[dict]]]): Worksheet names and rows, which may repeat
+        fill (dict[str, Any] | None): Values for missing cells, by worksheet name
+    """
+    fill = fill or {}
+    spools: dict[str, SheetSpool] = {}
+    try:
+        for name, rows in sheets:
+            if name not in spools:
+                spools[name] = SheetSpool(name, fill.get(name))
+            spools[name].extend(rows)
+
+        wb = Workbook(write_only=True)
+        for spool in spools.values():
+            ws = wb.create_sheet(spool.name)
+            if spool.columns:
+                ws.append([_header_cell(ws, column) for column in spool.columns])
+            for row in spool.rows():
+                ws.append(row)
+        wb.save(path)
+    finally:
+        for spool in spools.values():
+            spool.close()
+
+
+_thin = Side(style="thin")
+
+
+def _header_cell(ws, value: Any) -> WriteOnlyCell:
+    # match the header style of pandas
+    cell = WriteOnlyCell(ws, value=value)
+    cell.font = Font(bold=True)
+    cell.border = Border(left=_thin, right=_thin, top=_thin, bottom=_thin)
+    cell.alignment = Alignment(horizontal="center", vertical="top")
+    return cell
@@ -0,0 +1,263 @@
+"""
+A cache of rendered figures for Word reports.
+
+Figures are rendered by `pybmds` while writing a report. When a `FigureCache` is passed to the
+report builder, plot methods return a `CachedFigure` instead of rendering a figure while the report
+is written; the figure is only rendered when added to a report if it is not already in the store.
+Figures are keyed by a hash of the session or model results they are drawn from, so report variants
+of the same analysis reuse figures.
+
+Figures can also be rendered for all sessions in a process pool before a report is written.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+from collections.abc import Callable, Iterator
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial, wraps
+from io import BytesIO
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from django.conf import settings
+from docx.shared import Inches
+
+import pybmds.session
+from pybmds import __version__ as pybmds_version
+from pybmds.constants import ModelClass
+from pybmds.models import multi_tumor
+from pybmds.models.base import BmdModel, BmdModelAveraging
+from pybmds.plotting import close_figure
+from pybmds.reporting import styling
+
+from ...common.task_cache import ReportStore
+from ...common.utils import can_start_processes
+from ..executor import deserialize
+
+if TYPE_CHECKING:
+    from ..models import Analysis
+
+logger = logging.getLogger(__name__)
+
+_store: ContextVar[ReportStore | None] = ContextVar("figure_store", default=None)
+_add_mpl_figure = styling.add_mpl_figure
+_lock = threading.Lock()
+_n_active = 0
+_originals: list[tuple[Any, str, Any]] = []
+
+
+class CachedFigure:
+    """A figure which is only rendered if it is not in the figure store."""
+
+    def __init__(self, key: str, render: Callable):
+        self.key = key
+        self.render = render
+        self.figure = None
+
+    def __getattr__(self, name: str) -> Any:
+        # render the figure if it is used for anything other than adding it to a report
+        if self.figure is None:
+            self.figure = self.render()
+        return getattr(self.figure, name)
+
+    def png(self) -> BytesIO:
+        store = _store.get()
+        content = store.get(self.key) if store else None
+        if content is None:
+            fig = self.figure or self.render()
+            content = BytesIO()
+            fig.savefig(content)
+            fig.clf()
+            close_figure(fig)
+            if store:
+                store.set(self.key, content, evict=False)
+        return content
+
+
+def add_mpl_figure(document, fig, size_in_inches: float):
+    if not isinstance(fig, CachedFigure):
+        return _add_mpl_figure(document, fig, size_in_inches)
+    document.add_picture(fig.png(), width=Inches(size_in_inches))
+
+
+def _cached(method: Callable, get_data: Callable) -> Callable:
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if _store.get() is None:
+            return method(self, *args, **kwargs)
+        data = {
+            "figure": f"{type(self).__qualname__}.{method.__name__}",
+            "pybmds": pybmds_version,
+            "args": args,
+            "kwargs": kwargs,
+            "data": get_data(self),
+        }
+        value = json.dumps(data, sort_keys=True, default=str)
+        key = f"figure-{hashlib.sha256(value.encode()).hexdigest()}"
+        return CachedFigure(key, partial(method, self, *args, **kwargs))
+
+    return wrapper
+
+
+def _model_data(model: BmdModel) -> dict:
+    return {"dataset": model.dataset.serialize().model_dump(), "model": model.to_dict()}
+
+
+def _model_average_data(model_average: BmdModelAveraging) -> dict:
+    return {
+        "dataset": model_average.session.dataset.serialize().model_dump(),
+        "settings": model_average.settings.model_dump(),
+        "results": model_average.results.model_dump() if model_average.results else None,
+    }
+
+
+def _install():
+    # pybmds imports `add_mpl_figure` into each module, so it must be replaced in each module
+    hooks = [
+        (module, "add_mpl_figure", add_mpl_figure)
+        for module in (styling, pybmds.session, multi_tumor)
+    ]
+    for cls, name, get_data in (
+        (BmdModel, "plot", _model_data),
+        (BmdModel, "cdf_plot", _model_data),
+        (BmdModelAveraging, "cdf_plot", _model_average_data),
+        (pybmds.session.Session, "plot", lambda s: s.to_dict()),
+        (multi_tumor.Multitumor, "plot", lambda s: s.to_dict()),
+    ):
+        hooks.append((cls, name, _cached(getattr(cls, name), get_data)))
+    for obj, name, value in hooks:
+        _originals.append((obj, name, getattr(obj, name)))
+        setattr(obj, name, value)
+
+
+def _uninstall():
+    while _originals:
+        obj, name, value = _originals.pop()
+        setattr(obj, name, value)
+
+
+class FigureCache:
+    """Caches figures in a store, for a report builder such as `build_docx`.
+
+    `pybmds` plotting and reporting is patched while any report using a figure cache is written;
+    the patches have no effect outside of these reports, and are removed once they are complete.
+    """
+
+    def __init__(self, store: ReportStore, max_workers: int = 1):
+        self.store = store
+        self.max_workers = max_workers
+
+    @classmethod
+    def build_default(cls) -> FigureCache:
+        store = ReportStore(path=Path(settings.REPORT_STORE_PATH) / "figures")
+        return cls(store, max_workers=settings.REPORT_FIGURE_WORKERS)
+
+    @contextmanager
+    def activate(self) -> Iterator[FigureCache]:
+        """Cache figures in the store while writing reports in this context."""
+        global _n_active
+        with _lock:
+            if _n_active == 0:
+                _install()
+            _n_active += 1
+        token = _store.set(self.store)
+        try:
+            yield self
+        finally:
+            _store.reset(token)
+            with _lock:
+                _n_active -= 1
+                if _n_active == 0:
+                    _uninstall()
+
+    def prerender(self, analysis: Analysis, options: dict):
+        """Render figures for each session in a process pool, if multiple workers are available.
+
+        Sessions are submitted as they are loaded, with a limited number in progress at a time.
+        Figures which are not rendered are rendered when the report is written.
+
+        Args:
+            analysis (Analysis): A finished analysis
+            options (dict): Options for `to_docx`
+        """
+        if self.max_workers <= 1:
+            return
+        if not can_start_processes():
+            # daemonic processes, such as celery workers, cannot start a process pool
+            logger.info("Figures rendered while writing report; cannot start processes")
+            return
+        self.store.path.mkdir(parents=True, exist_ok=True)
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = set()
+            for data in analysis.iter_session_outputs():
+                if len(pending) >= self.max_workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    _check(done)
+                pending.add(
+                    pool.submit(
+                        _render_session, analysis.model_class, data, options, self.store.path
+                    )
+                )
+            _check(wait(pending).done)
+        self.store.evict()
+
+
+def session_figures(
+    session, all_models: bool = False, bmd_cdf_table: bool = False, **kw
+) -> Iterator[Any]:
+    """Plot the figures which `pybmds` adds to a Word report for a session.
+
+    Figures are plotted in the same way as `to_docx`, so they have the same keys in the store.
+    """
+    if isinstance(session, multi_tumor.Multitumor):
+        yield session.plot()
+        for selected_idx, models in zip(
+            session.results.selected_model_indexes, session.models, strict=True
+        ):
+            if not all_models:
+                models = [] if selected_idx is None else [models[selected_idx]]
+            yield from _model_figures(models, bmd_cdf_table)
+        return
+
+    if session.model_average and session.is_bayesian() and session.model_average.has_results:
+        yield session.plot(colorize=False)
+    elif session.models[0].has_results:
+        yield session.plot(colorize=True)
+    if session.is_bayesian():
+        if session.model_average and bmd_cdf_table:
+            yield session.model_average.cdf_plot(xlabel=session.dataset.get_xlabel())
+        models = session.models if all_models else []
+    else:
+        selected = [session.selected.model] if session.selected.model else []
+        models = session.models if all_models else selected
+    yield from _model_figures(models, bmd_cdf_table)
+
+
+def _model_figures(models: list[BmdModel], bmd_cdf_table: bool) -> Iterator[Any]:
+    for model in models:
+        if model.has_results:
+            yield model.plot()
+            if bmd_cdf_table:
+                yield model.cdf_plot()
+
+
+def _render_session(model_class: ModelClass, data: dict, options: dict, path: Path):
+    # render figures for a single session directly into the store, without writing a report
+    session = deserialize(model_class, data)
+    with FigureCache(ReportStore(path=path)).activate():
+        for item in session.batch_sessions():
+            for fig in session_figures(item, **options):
+                fig.png()
+
+
+def _check(futures):
+    # figures which could not be rendered in the pool are rendered when the report is written
+    for future in futures:
+        if exc := future.exception():
+            logger.warning(f"Figure rendering failed: {exc}")
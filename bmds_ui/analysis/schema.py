@@ -36,6 +36,7 @@ class AnalysisSessionSchema(BaseModel):
     frequentist: dict | None = None
     bayesian: dict | None = None
     error: str | None = None
+    cached: bool = False
 
 
 class AnalysisSchemaVersions(StrEnum):
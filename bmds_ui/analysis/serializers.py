@@ -14,6 +14,8 @@ class AnalysisSerializer(serializers.ModelSerializer):
     is_finished = serializers.BooleanField(read_only=True)
     has_errors = serializers.BooleanField(read_only=True)
     inputs_valid = serializers.BooleanField(read_only=True)
+    progress = serializers.DictField(read_only=True)
+    outputs = serializers.SerializerMethodField()
     collections = CollectionSerializer(many=True)
     api_url = serializers.URLField(source="get_api_url", read_only=True)
     excel_url = serializers.URLField(source="get_excel_url", read_only=True)
@@ -31,6 +33,7 @@ class AnalysisSerializer(serializers.ModelSerializer):
             "is_finished",
             "has_errors",
             "inputs_valid",
+            "progress",
             "api_url",
             "excel_url",
             "word_url",
@@ -48,6 +51,7 @@ class AnalysisSerializer(serializers.ModelSerializer):
             "is_finished",
             "has_errors",
             "inputs_valid",
+            "progress",
             "api_url",
             "excel_url",
             "word_url",
@@ -56,6 +60,12 @@ class AnalysisSerializer(serializers.ModelSerializer):
             "ended",
         )
 
+    def get_outputs(self, instance) -> dict | None:
+        # sessions are not loaded while polling during execution; only progress is returned
+        if instance.is_executing:
+            return None
+        return instance.get_outputs()
+
     def create(self, validated_data):
         instance = super().create(validated_data)
         instance.start_execute()
@@ -1,11 +1,35 @@
+from django.conf import settings
 from django.db import transaction
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
+from django.utils.timezone import now
+from reversion.signals import post_revision_commit
 
-from ..common.vacuum import maybe_vacuum
-from .models import Analysis
+from ..common.retention import prune_versions
+from ..common.vacuum import record_write
+from .models import Analysis, AnalysisSessionOutput
 
 
-@receiver(post_save, sender=Analysis)
-def vacuum_database(**kwargs):
-    transaction.on_commit(maybe_vacuum, robust=True)
+@receiver([post_save, post_delete], sender=Analysis)
+def database_write(**kwargs):
+    transaction.on_commit(record_write)
+
+
+@receiver(pre_save, sender=Analysis)
+def revert_analysis(instance, raw: bool, **kwargs):
+    # a reverted analysis is saved raw, and fields not saved in revisions are reset to defaults.
+    # Results require re-execution, so remove session rows from the prior execution; keep the
+    # current deletion date, and update the last updated time so reports are regenerated.
+    if not raw or instance.started is not None or instance.outputs:
+        return
+    current = Analysis.objects.filter(id=instance.id).values("deletion_date").first()
+    if current is None:
+        return  # a new analysis, such as one loaded from a fixture
+    instance.deletion_date = current["deletion_date"]
+    instance.last_updated = now()
+    AnalysisSessionOutput.all_objects.filter(analysis_id=instance.id).delete()
+
+
+@receiver(post_revision_commit)
+def cap_versions(versions, **kwargs):
+    prune_versions(versions, settings.REVISION_MAX_VERSIONS)
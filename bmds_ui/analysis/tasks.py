@@ -1,8 +1,9 @@
-from celery import shared_task
+from celery import chord, shared_task
 from celery.utils.log import get_task_logger
 from django.apps import apps
 
 from .reporting.cache import DocxReportCache, ExcelReportCache
+from .schema import AnalysisSessionSchema
 
 logger = get_task_logger(__name__)
 
@@ -15,6 +16,40 @@ def try_execute(id_: str):
     logger.info(f"finished execution: {analysis}")
 
 
+@shared_task()
+def try_run_combination(id_: str, dataset_index: int, option_index: int) -> dict:
+    analysis = apps.get_model("analysis", "Analysis").objects.get(id=id_)
+    logger.info(f"starting session {dataset_index=} {option_index=}: {analysis}")
+    output = analysis.run_combinations([(dataset_index, option_index)])[0]
+    return output.model_dump(by_alias=True)
+
+
+@shared_task()
+def try_finish_execution(outputs: list[dict], id_: str):
+    analysis = apps.get_model("analysis", "Analysis").objects.get(id=id_)
+    analysis.try_finish_execution([AnalysisSessionSchema.model_validate(d) for d in outputs])
+    logger.info(f"finished execution: {analysis}")
+
+
+@shared_task()
+def handle_execution_error(request, exc, traceback, id_: str):
+    analysis = apps.get_model("analysis", "Analysis").objects.get(id=id_)
+    logger.error(f"distributed execution failed: {analysis}")
+    analysis.handle_execution_error(f"{exc!r}\n{traceback}")
+
+
+def try_execute_distributed(id_: str, combinations: list[tuple[int, int]]):
+    """Execute each combination in a separate task, and save results when all are complete.
+
+    Args:
+        id_ (str): The analysis ID
+        combinations (list[tuple[int, int]]): A list of (dataset_index, option_index)
+    """
+    header = [try_run_combination.s(id_, d, o) for d, o in combinations]
+    callback = try_finish_execution.s(id_).on_error(handle_execution_error.s(id_))
+    return chord(header)(callback)
+
+
 @shared_task()
 def delete_old_analyses():
     logger.info("Deleting old analyses")
@@ -29,6 +64,13 @@ def delete_bot_analyses():
     Analysis.delete_unnamed_clones()
 
 
+@shared_task()
+def update_analytics():
+    logger.info("Updating analytics")
+    n_days = apps.get_model("analysis", "DailyAnalytics").update_all()
+    logger.info(f"Updated analytics for {n_days} days")
+
+
 @shared_task()
 def generate_report(id_: str, **kw):
     logger.info(f"starting report generation: {id_}")
@@ -43,3 +85,18 @@ def generate_excel(id_: str):
     analysis = apps.get_model("analysis", "Analysis").objects.get(id=id_)
     ExcelReportCache(analysis).create_content()
     logger.info(f"finishing excel generation: {id_}")
+
+
+@shared_task()
+def pregenerate_reports(id_: str):
+    logger.info(f"starting report pregeneration: {id_}")
+    analysis = apps.get_model("analysis", "Analysis").objects.get(id=id_)
+    ExcelReportCache(analysis).pregenerate()
+    # the report is requested by the analysis editor, who has just executed it
+    DocxReportCache(analysis, **analysis.docx_options(edit=True)).pregenerate()
+    logger.info(f"finishing report pregeneration: {id_}")
+
+
+def start_pregenerate_reports(id_: str):
+    # a low priority, so tasks which users are waiting on are processed first
+    pregenerate_reports.apply_async(args=(id_,), priority=9, expires=60 * 60)
@@ -3,7 +3,7 @@ from typing import ClassVar
 from django.conf import settings
 from django.contrib.admin.views.decorators import staff_member_required
 from django.db.models.query import QuerySet
-from django.http import HttpRequest, HttpResponse
+from django.http import Http404, HttpRequest, HttpResponse
 from django.middleware.csrf import get_token
 from django.shortcuts import get_object_or_404, render
 from django.template import RequestContext, Template
@@ -21,7 +21,7 @@ from django.views.generic import (
 
 from ..common.views import HtmxView, action, desktop_only, int_or_404, uuid_or_404
 from . import constants, forms, models
-from .reporting.analytics import get_cached_analytics
+from .reporting import analytics
 from .utils import get_citation
 
 
@@ -178,12 +178,28 @@ class AnalysisHistory(TemplateView):
 
 
 @method_decorator(staff_member_required, name="dispatch")
-class Analytics(TemplateView):
+class Analytics(HtmxView):
+    """The analytics page; each panel is loaded and cached separately."""
+
+    actions: ClassVar[set[str]] = {"index", "panel"}
     template_name: str = "analysis/analytics.html"
 
-    def get_context_data(self, **kwargs) -> dict:
-        kwargs.update(config=get_cached_analytics())
-        return super().get_context_data(**kwargs)
+    def index(self, request: HttpRequest, **kw):
+        return render(request, self.template_name)
+
+    @action()
+    def panel(self, request: HttpRequest, **kw):
+        name = request.GET.get("name", "")
+        if name not in analytics.PANELS:
+            raise Http404()
+        if name != "runtime" and not models.DailyAnalytics.objects.exists():
+            # daily rollups are computed by a periodic task, which may not have run yet
+            return render(request, "analysis/fragments/analytics_pending.html")
+        return render(
+            request,
+            f"analysis/fragments/analytics_{name}.html",
+            {"config": analytics.get_cached_panel(name)},
+        )
 
 
 def get_analysis_or_404(pk: str, password: str | None = "") -> tuple[models.Analysis, bool]:
@@ -261,12 +277,18 @@ class AnalysisClone(RedirectView):
 
     def get_redirect_url(self, *args, **kwargs):
         analysis, _ = get_analysis_or_404(self.kwargs["pk"])
+        session_outputs = list(analysis.session_outputs.all())
         analysis.id = None
+        analysis.retained_sessions = {}
         analysis.inputs["analysis_name"] = analysis.inputs.get("analysis_name", "") + " (clone)"
         analysis.inputs["analysis_description"] = (
             analysis.inputs.get("analysis_description", "") + f" (cloned from {kwargs['pk']})"
         )
         analysis.save()
+        for session_output in session_outputs:
+            session_output.id = None
+            session_output.analysis = analysis
+        models.AnalysisSessionOutput.objects.bulk_create(session_outputs)
         return analysis.get_edit_url()
 
 
@@ -0,0 +1,36 @@
+import json
+from collections.abc import Sequence
+from typing import Any
+
+from django.db import NotSupportedError
+from django.db.models import Func, JSONField
+
+
+class JSONSet(Func):
+    """Set the value at a path in a JSON field, without reading or rewriting the document.
+
+    Uses `jsonb_set` on PostgreSQL and `json_set` on SQLite; if an object in the path does not
+    exist, the document is unchanged on PostgreSQL, and the object is created on SQLite.
+
+    Example:
+        Model.objects.filter(id=1).update(data=JSONSet("data", ("a", "b"), {"c": 1}))
+    """
+
+    output_field = JSONField()
+
+    def __init__(self, expression, path: Sequence[str], value: Any, **extra):
+        self.path = tuple(path)
+        self.value = json.dumps(value)
+        super().__init__(expression, **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError(f"JSONSet is not supported on {connection.vendor}")
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.get_source_expressions()[0])
+        path = "$." + ".".join(f'"{key}"' for key in self.path)
+        return f"JSON_SET({sql}, %s, JSON(%s))", (*params, path, self.value)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.get_source_expressions()[0])
+        return f"JSONB_SET({sql}, %s::text[], %s::jsonb)", (*params, list(self.path), self.value)
@@ -1,4 +1,6 @@
 import json
+import zipfile
+from importlib.util import find_spec
 from io import BytesIO
 from typing import NamedTuple, TypeAlias
 
@@ -21,7 +23,13 @@ class BinaryFile(NamedTuple):
     filename: str
 
 
+class DataFrames(NamedTuple):
+    data: dict[str, pd.DataFrame]
+    filename: str
+
+
 BinaryRendererData: TypeAlias = list | dict | BinaryFile
+TableRendererData: TypeAlias = list | dict | DataFrames
 
 
 def write_error_docx(context: str = "") -> BinaryFile:
@@ -42,6 +50,32 @@ def write_error_xlsx(context: str = "") -> BinaryFile:
     return BinaryFile(data=file, filename="error")
 
 
+def write_error_dataframes(context: str = "") -> DataFrames:
+    return DataFrames(data={"error": pd.DataFrame({"Status": [context]})}, filename="error")
+
+
+def _error_context(data) -> str:
+    try:
+        return json.dumps(data, indent=2)
+    except TypeError:
+        return "An error occurred"
+
+
+def to_typed(df: pd.DataFrame) -> pd.DataFrame:
+    """Replace missing value placeholders in report tables with nulls, for machine consumers.
+
+    Columns which still have mixed types after placeholders are removed are converted to strings.
+    """
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        values = df[col].mask(df[col] == "-").infer_objects()
+        types = {type(value) for value in values.dropna()}
+        df[col] = values.astype(str).mask(values.isna()) if len(types) > 1 else values
+    return df
+
+
 class XlsxRenderer(BaseRenderer):
     media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     format = "xlsx"
@@ -74,3 +108,49 @@ class DocxRenderer(BaseRenderer):
         response = renderer_context["response"]
         response["Content-Disposition"] = f'attachment; filename="{data.filename}.docx"'
         return data.data.getvalue()
+
+
+class CsvZipRenderer(BaseRenderer):
+    """Render tables as a zip archive of CSV files, one per table."""
+
+    media_type = "application/zip"
+    format = "zip"
+
+    def render(self, data: TableRendererData, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, DataFrames):
+            data = write_error_dataframes(_error_context(data))
+
+        f = BytesIO()
+        with zipfile.ZipFile(f, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for name, df in data.data.items():
+                zf.writestr(f"{name}.csv", to_typed(df).to_csv(index=False))
+
+        response = renderer_context["response"]
+        response["Content-Disposition"] = f'attachment; filename="{data.filename}.zip"'
+        return f.getvalue()
+
+
+class ParquetRenderer(BaseRenderer):
+    """Render a single table as a Parquet file; requires the optional `pyarrow` package."""
+
+    media_type = "application/vnd.apache.parquet"
+    format = "parquet"
+
+    def render(self, data: TableRendererData, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, DataFrames):
+            data = write_error_dataframes(_error_context(data))
+        if len(data.data) != 1:
+            raise ValueError("Parquet files contain a single table")
+
+        df = next(iter(data.data.values()))
+        f = BytesIO()
+        to_typed(df).to_parquet(f, index=False)
+
+        response = renderer_context["response"]
+        response["Content-Disposition"] = f'attachment; filename="{data.filename}.parquet"'
+        return f.getvalue()
+
+
+TABLE_RENDERERS = (CsvZipRenderer,)
+if find_spec("pyarrow"):
+    TABLE_RENDERERS = (CsvZipRenderer, ParquetRenderer)
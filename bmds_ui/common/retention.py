@@ -0,0 +1,96 @@
+import logging
+import time
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import QuerySet
+from reversion.models import Revision, Version
+
+logger = logging.getLogger(__name__)
+
+
+def _delete_versions(versions: QuerySet) -> int:
+    # delete versions, and revisions which no longer have any versions
+    revision_ids = set(versions.values_list("revision_id", flat=True))
+    n_versions, _ = versions.delete()
+    Revision.objects.filter(id__in=revision_ids, version__isnull=True).delete()
+    return n_versions
+
+
+def delete_versions(model, pks: list) -> int:
+    """Delete reversion history for objects.
+
+    Args:
+        model: The model of the objects
+        pks (list): Primary keys of the objects
+
+    Returns:
+        int: The number of versions deleted
+    """
+    content_type = ContentType.objects.get_for_model(model)
+    return _delete_versions(
+        Version.objects.filter(content_type=content_type, object_id__in=[str(pk) for pk in pks])
+    )
+
+
+def prune_versions(versions: list[Version], max_versions: int) -> int:
+    """Delete the oldest versions of objects, keeping at most `max_versions` for each object.
+
+    Args:
+        versions (list[Version]): New versions; older versions of the same objects are pruned
+        max_versions (int): The number of versions to keep; if zero, all versions are kept
+
+    Returns:
+        int: The number of versions deleted
+    """
+    if max_versions <= 0:
+        return 0
+    pks = []
+    for version in versions:
+        pks.extend(
+            Version.objects.filter(
+                content_type_id=version.content_type_id,
+                object_id=version.object_id,
+                db=version.db,
+            )
+            .order_by("-pk")
+            .values_list("pk", flat=True)[max_versions:]
+        )
+    if not pks:
+        return 0
+    return _delete_versions(Version.objects.filter(pk__in=pks))
+
+
+def delete_in_batches(qs: QuerySet, label: str, batch_size: int | None = None) -> int:
+    """Delete objects in a queryset, and their reversion history, in batches.
+
+    Each batch is deleted in a separate short transaction, so large deletions do not hold locks
+    or build large transactions; objects which match the queryset are deleted until none remain.
+
+    Args:
+        qs (QuerySet): The objects to delete
+        label (str): A description of the objects, for logging
+        batch_size (int | None): Objects per batch; defaults to `settings.RETENTION_BATCH_SIZE`
+
+    Returns:
+        int: The number of objects deleted
+    """
+    batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+    model = qs.model
+    started = time.perf_counter()
+    n_deleted = n_versions = 0
+    while True:
+        with transaction.atomic():
+            pks = list(qs.order_by().values_list("pk", flat=True)[:batch_size])
+            if not pks:
+                break
+            n_versions += delete_versions(model, pks)
+            model._default_manager.filter(pk__in=pks).delete()
+        n_deleted += len(pks)
+    elapsed = time.perf_counter() - started
+    rate = n_deleted / elapsed if elapsed > 0 else 0
+    logger.info(
+        f"Removed {n_deleted} {label} and {n_versions} versions in {elapsed:.1f}s ({rate:.0f}/s)"
+    )
+    return n_deleted
@@ -1,14 +1,26 @@
 import abc
+import hashlib
+import json
+import os
+import uuid
 from enum import IntEnum
-from typing import Any
+from io import BytesIO
+from pathlib import Path
+from stat import S_ISREG
+from typing import Any, BinaryIO
 
+from django.conf import settings
 from django.core.cache import cache
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from .. import __version__
 
 
 class ReportStatus(IntEnum):
     QUEUED = 1
     COMPLETE = 2
+    GENERATING = 3
+    ERROR = 4
 
 
 class ReportResponse(BaseModel):
@@ -16,29 +28,158 @@ class ReportResponse(BaseModel):
     content: Any | None = None
     header: str | None = None
     message: str | None = None
+    key: str | None = Field(default=None, exclude=True)
+
+
+class ReportStore:
+    """
+    A filesystem store for generated reports, keyed by content. When the total size of the store
+    exceeds a maximum, the least recently used reports are removed.
+
+    Reports are written by a celery worker and read by the web application, so both must share
+    the same store path (by default, `PUBLIC_DATA_ROOT/reports`).
+    """
+
+    def __init__(self, path: Path | None = None, max_size: int | None = None):
+        self.path = Path(path or settings.REPORT_STORE_PATH)
+        self.max_size = settings.REPORT_STORE_MAX_SIZE if max_size is None else max_size
+
+    def get(self, key: str) -> BytesIO | None:
+        path = self.path / key
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            return None
+        return BytesIO(data)
+
+    def open(self, key: str) -> BinaryIO | None:
+        """Open a report for reading, without reading it into memory."""
+        path = self.path / key
+        try:
+            file = path.open("rb")
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            return None
+        return file
+
+    def exists(self, key: str) -> bool:
+        return (self.path / key).exists()
+
+    def temporary_path(self) -> Path:
+        """A path in the store for writing a report before it is set."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        return self.path / f".{uuid.uuid4().hex}"
+
+    def set(self, key: str, content: BytesIO | Path, evict: bool = True):
+        """Set a report; a path from `temporary_path` is moved into the store without copying.
+
+        If many items are set at once, eviction can be skipped and `evict` called afterwards.
+        """
+        if isinstance(content, Path):
+            content.replace(self.path / key)
+        else:
+            # write to a temporary file and rename so readers never see a partial file
+            temp = self.temporary_path()
+            temp.write_bytes(content.getvalue())
+            temp.replace(self.path / key)
+        if evict:
+            self.evict()
+
+    def evict(self):
+        files = []
+        for path in self.path.iterdir():
+            if path.name.startswith("."):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if not S_ISREG(stat.st_mode):  # skip directories, such as nested stores
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
 
 
 class ReportCache(abc.ABC):
     """
     A cache designed for long-running report tasks.  The cache is designed for polling requests;
-    initially a QUEUED status will be created, followed by the actual result.  Results can be
-    cached for a long period, or could be discarded immediately after returning to a user.
+    initially a QUEUED status will be created, followed by the actual result.
+
+    Generated reports are saved in a `ReportStore`, keyed by a hash of the analysis, when it was
+    last updated, the application version, and the report options, so they can be returned again
+    until the analysis is changed; the cache only contains the status and a pointer to the report
+    in the store.
+
+    If `stream` is set, content is returned as an open file rather than read into memory, and
+    `create` may write content to a `ReportStore.temporary_path` and return the path.
+
+    Each set of report options has a separate status, so multiple variants of a report can be
+    requested and returned at the same time.
+
+    Generation is single-flight; a request or task must atomically claim a lease before creating a
+    report, so concurrent requests from multiple web workers create each report only once. If a
+    task fails, the claim is released and an error status is returned for a short time, after
+    which the report is requested again.
     """
 
     cache_prefix: str = ""  # should be unique for each subclass
     status = ReportStatus
+    stream: bool = False
+    lease: int = 60 * 10  # seconds a claim to generate a report is held before it expires
+    error_timeout: int = 60  # seconds a failure is returned before the report is requested again
 
     def __init__(self, analysis, **kw):
         self.cache = cache
+        self.store = ReportStore()
         self.analysis = analysis
         self.kw = kw
 
     @property
-    def cache_key(self):
+    def generation_key(self) -> str:
         return f"{self.cache_prefix}-{self.analysis.id}"
 
+    @property
+    def cache_key(self) -> str:
+        # the generation is shared by all variants, so they can be cleared together
+        self.cache.add(self.generation_key, uuid.uuid4().hex, timeout=60 * 60 * 24 * 7)
+        generation = self.cache.get(self.generation_key)
+        options = json.dumps(self.kw, sort_keys=True, default=str)
+        options_hash = hashlib.md5(options.encode(), usedforsecurity=False).hexdigest()
+        return f"{self.cache_prefix}-{self.analysis.id}-{generation}-{options_hash}"
+
+    def content_key(self) -> str:
+        """
+        A key for the report content; a hash of the analysis, when it was last updated, the
+        application version, and the report options. The analysis content is not loaded.
+        """
+        data = json.dumps(
+            {
+                "id": self.analysis.id,
+                "last_updated": self.analysis.last_updated,
+                "version": __version__,
+                "options": self.kw,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return f"{self.cache_prefix}-{hashlib.sha256(data.encode()).hexdigest()}"
+
+    def claim(self, key: str) -> bool:
+        """Atomically claim the right to generate a report; returns True if claimed."""
+        return self.cache.add(f"{key}-claim", uuid.uuid4().hex, timeout=self.lease)
+
+    def release(self, key: str):
+        self.cache.delete(f"{key}-claim")
+
     def delete(self):
-        self.cache.delete(self.cache_key)
+        """Clear the status of all report variants for the analysis."""
+        self.cache.delete(self.generation_key)
 
     @abc.abstractmethod
     def invoke_celery_task(self) -> None:
@@ -61,7 +202,7 @@ class ReportCache(abc.ABC):
 
     def request_content(self) -> ReportResponse:
         """
-        Request the content if it exists; otherwise return teh current status and optionally kick
+        Request the content if it exists; otherwise return the current status and optionally kick
         off a task to create it. To be called from an HTTP request lifecycle.
 
         Returns:
@@ -71,31 +212,87 @@ class ReportCache(abc.ABC):
         # try to get content from cache
         key = self.cache_key
         response = self.cache.get(key)
-        if response:
+        if response and response.status is not ReportStatus.COMPLETE:
             return response
+        if response:
+            content = self.read(response.key)
+            if content is not None:
+                return response.model_copy(update={"content": content})
 
-        # nothing done yet, request!
+        # try to get content with the same key from the store
+        content_key = self.content_key()
+        content = self.read(content_key)
+        if content is not None:
+            response = self._set_complete(content_key)
+            return response.model_copy(update={"content": content})
+
+        # nothing done yet, request if no other request has already claimed it
         response = ReportResponse(
             status=ReportStatus.QUEUED,
             content=None,
             header="Report being created",
             message="Report requested... please wait until results are complete.",
         )
-        self.cache.set(key, response, 60 * 10)  # save a queued status for up to 10 minutes
-        self.invoke_celery_task()
+        if self.claim(key):
+            self.cache.set(key, response, timeout=self.lease)
+            self.invoke_celery_task()
         return response
 
     def create_content(self) -> ReportResponse:
         """
-        Generate and cache the content.
+        Generate and store the content.
+        """
+        key = self.cache_key
+        content_key = self.content_key()
+        response = ReportResponse(
+            status=ReportStatus.GENERATING,
+            content=None,
+            header="Report being created",
+            message="Report generation in progress... please wait until results are complete.",
+        )
+        self.cache.set(key, response, timeout=self.lease)
+        try:
+            content = self.create()
+            self.store.set(content_key, content)
+            response = self._set_complete(content_key)
+        except Exception:
+            response = ReportResponse(
+                status=ReportStatus.ERROR,
+                content=None,
+                header="Report failed",
+                message="An error occurred while creating the report... please try again later.",
+            )
+            self.cache.set(key, response, timeout=self.error_timeout)
+            raise
+        finally:
+            self.release(key)
+        if isinstance(content, Path):
+            return response  # content was written to the store and is not held in memory
+        return response.model_copy(update={"content": content})
+
+    def pregenerate(self):
+        """
+        Generate and store the content if it does not already exist, before it is requested.
         """
         key = self.cache_key
-        content = self.create()
+        content_key = self.content_key()
+        if self.store.exists(content_key):
+            self._set_complete(content_key)
+            return
+        if not self.claim(key):
+            return  # already being generated
+        self.create_content()
+
+    def read(self, content_key: str) -> BinaryIO | None:
+        return self.store.open(content_key) if self.stream else self.store.get(content_key)
+
+    def _set_complete(self, content_key: str) -> ReportResponse:
         response = ReportResponse(
             status=ReportStatus.COMPLETE,
-            content=content,
+            content=None,
             header=None,
             message=None,
+            key=content_key,
         )
-        self.cache.set(key, response, timeout=60 * 60)  # save result for up 1 hour
+        self.cache.set(self.cache_key, response, timeout=60 * 60 * 24)  # save pointer for 1 day
         return response
@@ -2,6 +2,7 @@ from celery import shared_task
 from celery.utils.log import get_task_logger
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from django.utils.module_loading import import_string
 
 from .worker_health import worker_healthcheck
 
@@ -18,3 +19,9 @@ def diagnostic_celery_task(id_: str):
 @shared_task
 def worker_healthcheck_push():
     worker_healthcheck.push()
+
+
+@shared_task
+def refresh_timeout_cache(name: str, args: list, kwargs: dict, token: str):
+    # refresh a stale result of a function decorated with `timeout_cache`
+    import_string(name).refresh(args, kwargs, token)
@@ -42,8 +42,8 @@ def icon(name: str):
 
 
 @register.simple_tag()
-def plotly(fig: Figure) -> str | None:
-    """Generate a plotly figure"""
+def plotly(fig: Figure | str) -> str | None:
+    """Generate a plotly figure, from a figure or figure JSON"""
     if fig is None:
         return ""
     id = uuid4()
@@ -51,14 +51,21 @@ def plotly(fig: Figure) -> str | None:
         dedent("""
     <div id="{id}"><span class="text-muted">Loading...</span></div>
     <script>
-        function startup () {{
-            const data = JSON.parse("{json}")
-            window.app.renderPlotlyFigure(document.getElementById("{id}"), data);
-        }};
-        document.addEventListener("DOMContentLoaded", startup, false);
+        (function () {{
+            const startup = function () {{
+                const data = JSON.parse("{json}")
+                window.app.renderPlotlyFigure(document.getElementById("{id}"), data);
+            }};
+            // render immediately if loaded after the page, such as in an htmx fragment
+            if (document.readyState === "loading") {{
+                document.addEventListener("DOMContentLoaded", startup, false);
+            }} else {{
+                startup();
+            }}
+        }})();
     </script>"""),
         id=id,
-        json=escapejs(fig.to_json()),
+        json=escapejs(fig if isinstance(fig, str) else fig.to_json()),
     )
 
 
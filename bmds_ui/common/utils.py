@@ -1,9 +1,15 @@
+import hashlib
+import json
 import logging
+import multiprocessing
 import secrets
 import string
+import time
+import uuid
 from collections.abc import Callable
 from datetime import datetime
 from functools import wraps
+from typing import Any
 
 from django.core.cache import cache
 
@@ -30,24 +36,97 @@ def get_bool(value: str | None) -> bool:
     return value is not None and value.lower() == "true"
 
 
-def timeout_cache(key: str, timeout: int) -> Callable:
-    """Decorator to cache result key for N seconds
+def can_start_processes() -> bool:
+    """Can this process start child processes? Daemonic processes, such as celery workers, cannot."""
+    return not multiprocessing.current_process().daemon
+
+
+def timeout_cache(
+    key: str, timeout: int, hard_timeout: int | None = None, lock_timeout: int = 300
+) -> Callable:
+    """Decorator to cache the result of a function, with stale-while-revalidate refreshes.
+
+    Results are fresh for `timeout` seconds. After that, the stale result is still returned
+    for up to `hard_timeout` seconds while a celery task refreshes it. If there is no cached
+    result, one caller computes it while concurrent callers wait for it, raising a `TimeoutError`
+    if it is not computed within `lock_timeout` seconds. A lock in the cache ensures only one
+    refresh runs at a time, across processes.
+
+    The decorated function must be importable by name from a module, so a worker can refresh it,
+    and its arguments must be JSON serializable. The cache key includes the function arguments; use
+    `wrapper.invalidate(*args, **kwargs)` to remove a cached result.
 
     Args:
         key (str): the cache key
-        timeout (int): timeout
+        timeout (int): seconds a result is fresh
+        hard_timeout (int | None): seconds a result is kept; defaults to twice the timeout
+        lock_timeout (int): seconds a refresh lock is held before it expires
     """
+    if hard_timeout is None:
+        hard_timeout = timeout * 2
+
+    def get_key(args: tuple, kwargs: dict) -> str:
+        if not args and not kwargs:
+            return key
+        value = json.dumps([args, kwargs], sort_keys=True, default=str)
+        return f"{key}-{hashlib.md5(value.encode(), usedforsecurity=False).hexdigest()}"
+
+    def release(lock_key: str, token: str):
+        # the lock may have expired and been claimed by another caller; only delete our own
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
 
     def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            data = cache.get(key)
-            if data is None:
-                logger.info(f"Caching `{key}` for {timeout}s")
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        def refresh(args: tuple, kwargs: dict, token: str) -> Any:
+            cache_key = get_key(args, kwargs)
+            try:
+                logger.info(f"Caching `{cache_key}` for {timeout}s")
                 data = func(*args, **kwargs)
-                cache.set(key, data, timeout=timeout)
+                entry = {"data": data, "expires": time.time() + timeout}
+                cache.set(cache_key, entry, timeout=hard_timeout)
+            finally:
+                release(f"{cache_key}-lock", token)
             return data
 
+        def start_refresh(args: tuple, kwargs: dict, token: str):
+            from .tasks import refresh_timeout_cache
+
+            try:
+                refresh_timeout_cache.delay(name, args, kwargs, token)
+            except Exception:
+                logger.exception(f"Could not refresh `{name}`")
+                release(f"{get_key(args, kwargs)}-lock", token)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_key = get_key(args, kwargs)
+            lock_key = f"{cache_key}-lock"
+            deadline = time.time() + lock_timeout
+            while True:
+                entry = cache.get(cache_key)
+                if entry is not None and entry["expires"] > time.time():
+                    return entry["data"]
+                token = uuid.uuid4().hex
+                locked = cache.add(lock_key, token, timeout=lock_timeout)
+                if entry is not None:
+                    # return the stale result; refresh it unless another caller already is
+                    if locked:
+                        start_refresh(args, kwargs, token)
+                    return entry["data"]
+                if locked:
+                    return refresh(args, kwargs, token)
+                if time.time() > deadline:
+                    raise TimeoutError(f"Timed out waiting for `{cache_key}`")
+                # another caller is computing the result; wait for it
+                time.sleep(0.1)
+
+        def invalidate(*args, **kwargs):
+            cache.delete(get_key(args, kwargs))
+
+        wrapper.refresh = refresh
+        wrapper.invalidate = invalidate
         return wrapper
 
     return decorator
@@ -1,19 +1,16 @@
 import logging
-import math
-from datetime import datetime
+import threading
+import time
 
 from django.conf import settings
-from django.core.cache import cache
-from django.db import connection
-from django.utils import timezone
+from django.db import connection, connections
 
 logger = logging.getLogger(__name__)
 
-VACUUM_TIMESTAMP_CACHE_KEY = "db-vacuum-timestamp"
+AUTO_VACUUM_INCREMENTAL = 2
 
-
-def clear_vacuum_cache():
-    cache.delete(VACUUM_TIMESTAMP_CACHE_KEY)
+# monotonic time of the last database write since maintenance was run
+_last_write: float | None = None
 
 
 def is_sqlite() -> bool:
@@ -21,33 +18,73 @@ def is_sqlite() -> bool:
     return "sqlite" in settings.DATABASES["default"]["ENGINE"]
 
 
-def should_vacuum() -> bool:
-    """Returns True if last vacuum if a vacuum is required based on timestamp of last vacuum."""
-    now = timezone.now()
-    last_vacuum = cache.get(VACUUM_TIMESTAMP_CACHE_KEY)
-    if last_vacuum:
-        last_vacuum = datetime.fromisoformat(last_vacuum)
-    if last_vacuum is None:
-        logger.info("VACUUM required, last vacuum unknown")
-        return True
-    last_vacuum_seconds = math.ceil((now - last_vacuum).total_seconds())
-    if last_vacuum_seconds >= settings.DB_VACUUM_INTERVAL_SECONDS:
-        logger.info(f"VACUUM required; last vacuum {last_vacuum_seconds} seconds ago")
-        return True
-    return False
+def record_write():
+    """Record that the database was written to, so maintenance is run once it is idle."""
+    global _last_write
+    _last_write = time.monotonic()
+
+
+def is_idle(idle_seconds: int) -> bool:
+    """Returns True if the database was written to, but not within the last `idle_seconds`."""
+    return _last_write is not None and time.monotonic() - _last_write >= idle_seconds
 
 
 def vacuum() -> bool:
-    """Vacuum if the database is SQLite, return True if a vacuum completed. Set cache timestamp."""
+    """Vacuum if the database is SQLite, return True if a vacuum completed."""
     if is_sqlite():
         with connection.cursor() as cursor:
             logger.info("VACUUM database...")
             cursor.execute("VACUUM")
-            cache.set(VACUUM_TIMESTAMP_CACHE_KEY, timezone.now().isoformat())
         return True
     return False
 
 
-def maybe_vacuum():
-    if is_sqlite() and should_vacuum():
-        vacuum()
+def maintain(pages: int) -> bool:
+    """Run incremental SQLite maintenance; return True if maintenance was run.
+
+    Free pages are returned to the filesystem with an incremental vacuum of at most `pages` pages,
+    query planner statistics are updated, and the write-ahead log is checkpointed. A database
+    created before incremental auto-vacuum was enabled is converted with a single full VACUUM.
+    """
+    global _last_write
+    if not is_sqlite():
+        return False
+    last_write = _last_write
+    started = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA auto_vacuum")
+        if cursor.fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+            logger.info("Enabling incremental auto-vacuum...")
+            cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            cursor.execute("VACUUM")
+        # each page is freed in a separate step, so results must be fetched
+        cursor.execute(f"PRAGMA incremental_vacuum({int(pages)})")
+        cursor.fetchall()
+        cursor.execute("PRAGMA optimize")
+        cursor.execute("PRAGMA wal_checkpoint(PASSIVE)")
+    if _last_write == last_write:
+        _last_write = None
+    logger.info(f"Database maintenance completed in {time.perf_counter() - started:.2f}s")
+    return True
+
+
+class MaintenanceThread(threading.Thread):
+    """Run SQLite maintenance in a background thread, when the database is idle after writes."""
+
+    def __init__(self):
+        self.stopped = threading.Event()
+        super().__init__(name="db-maintenance", daemon=True)
+
+    def run(self):
+        while not self.stopped.wait(settings.DB_MAINTENANCE_INTERVAL_SECONDS):
+            if not is_idle(settings.DB_MAINTENANCE_IDLE_SECONDS):
+                continue
+            try:
+                maintain(settings.DB_MAINTENANCE_PAGES)
+            except Exception:
+                logger.exception("Database maintenance failed")
+            finally:
+                connections.close_all()
+
+    def stop(self):
+        self.stopped.set()
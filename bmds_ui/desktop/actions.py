@@ -1,10 +1,13 @@
+import hashlib
 import json
 import os
 import platform
 import subprocess
 import sys
+import time
 from contextlib import redirect_stderr, redirect_stdout
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 from threading import Thread
 from urllib.error import URLError
@@ -26,18 +29,50 @@ from .. import __version__
 from ..main.settings import desktop
 from .config import Database, DesktopConfig, get_app_home, get_version_path
 from .log import log, stream
+from .server import PooledWSGIServer, WriteLock
 
 PRERELEASE_URL = "https://gitlab.epa.gov/api/v4/projects/1508/packages/pypi/simple"
 
 
+def static_fingerprint() -> str:
+    """A hash of the package version and the static files which are collected."""
+    from django.contrib.staticfiles.finders import get_finders
+
+    files = []
+    for finder in get_finders():
+        for path, storage in finder.list(["CVS", ".*", "*~"]):
+            stat = Path(storage.path(path)).stat()
+            files.append((path, stat.st_size, stat.st_mtime_ns))
+    data = json.dumps([__version__, sorted(files)])
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def has_unapplied_migrations() -> bool:
+    from django.db import connection
+    from django.db.migrations.executor import MigrationExecutor
+
+    executor = MigrationExecutor(connection)
+    return len(executor.migration_plan(executor.loader.graph.leaf_nodes())) > 0
+
+
 def sync_persistent_data():
     """Sync persistent data to database and static file path.
 
     We do this every time a database is created or an application starts, to make sure application
-    state is consistent with files.
+    state is consistent with files. Static files are only collected if the package version or
+    static files have changed, and migrations are only run if some are unapplied.
     """
-    call_command("collectstatic", interactive=False, verbosity=3, stdout=stream, stderr=stream)
-    call_command("migrate", interactive=False, verbosity=3, stdout=stream, stderr=stream)
+    fingerprint_path = Path(settings.STATIC_ROOT) / ".fingerprint"
+    fingerprint = static_fingerprint()
+    if not fingerprint_path.exists() or fingerprint_path.read_text() != fingerprint:
+        call_command("collectstatic", interactive=False, verbosity=1, stdout=stream, stderr=stream)
+        fingerprint_path.write_text(fingerprint)
+    else:
+        log.info("Static files are up to date")
+    if has_unapplied_migrations():
+        call_command("migrate", interactive=False, verbosity=1, stdout=stream, stderr=stream)
+    else:
+        log.info("Database is up to date")
 
 
 def setup_django_environment(db: Database):
@@ -65,9 +100,10 @@ def setup_django_environment(db: Database):
 
 def create_django_db(db: Database):
     log.info(f"Creating {db}")
+    started = time.perf_counter()
     setup_django_environment(db)
     sync_persistent_data()
-    log.info(f"Creation successful {db}")
+    log.info(f"Creation successful {db} ({time.perf_counter() - started:.1f}s)")
 
 
 class AppThread(Thread):
@@ -81,6 +117,7 @@ class AppThread(Thread):
         # stop server from another thread to prevent deadlocks
         def _func(server: WSGIServer):
             server.shutdown()
+            server.server_close()
 
         log.info("Stopping web application...")
         thread = Thread(target=_func, args=(self.server,))
@@ -88,15 +125,25 @@ class AppThread(Thread):
         log.info("Web application stopped")
 
     def run(self):
+        started = time.perf_counter()
         setup_django_environment(self.db)
         sync_persistent_data()
+        from ..common.vacuum import MaintenanceThread, maintain
         from ..main.wsgi import application
 
+        maintenance = MaintenanceThread()
+        maintenance.start()
         with redirect_stdout(stream), redirect_stderr(stream):
             app = WhiteNoise(application, root=settings.PUBLIC_DATA_ROOT)
-            self.server = make_server(self.config.server.host, self.config.server.port, app)
+            server_class = WSGIServer
+            if self.config.server.threads > 1:
+                server_class = partial(PooledWSGIServer, threads=self.config.server.threads)
+                app = WriteLock(app)
+            self.server = make_server(
+                self.config.server.host, self.config.server.port, app, server_class=server_class
+            )
             url = f"http://{self.config.server.host}:{self.config.server.port}"
-            log.info(f"Starting {url}")
+            log.info(f"Starting {url} (startup {time.perf_counter() - started:.1f}s)")
             if not settings.IS_TESTING:
                 open_new_tab(url)
             try:
@@ -104,7 +151,8 @@ class AppThread(Thread):
             except KeyboardInterrupt:
                 log.info(f"Stopping {url}")
             finally:
-                call_command("vacuum_db", stdout=stream, stderr=stream)
+                maintenance.stop()
+                maintain(settings.DB_MAINTENANCE_PAGES)
                 self._shutdown()
 
     def stop(self):
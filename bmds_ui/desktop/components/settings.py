@@ -17,6 +17,13 @@ class Settings(Static):
             id="port",
             validators=[Number(minimum=1001, maximum=65536)],
         )
+        yield Label("Threads")
+        yield Input(
+            value=str(config.server.threads),
+            type="integer",
+            id="threads",
+            validators=[Number(minimum=1, maximum=64)],
+        )
 
     @on(Input.Changed, "#host")
     def on_host_change(self, event: Input.Changed):
@@ -33,3 +40,10 @@ class Settings(Static):
             config = Config.get()
             config.server.port = int(event.value)
             Config.sync()
+
+    @on(Input.Changed, "#threads")
+    def on_threads_change(self, event: Input.Changed):
+        if event.validation_result and event.validation_result.is_valid:
+            config = Config.get()
+            config.server.threads = int(event.value)
+            Config.sync()
@@ -52,6 +52,7 @@ class Database(BaseModel):
 class WebServer(BaseModel):
     host: str = "127.0.0.1"
     port: int = 5555
+    threads: int = 8  # requests handled concurrently; 1 handles one request at a time
 
     def is_free(self) -> bool:
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
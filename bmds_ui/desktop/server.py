@@ -0,0 +1,57 @@
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from wsgiref.simple_server import WSGIServer
+
+SAFE_METHODS = frozenset(["GET", "HEAD", "OPTIONS"])
+
+
+class PooledWSGIServer(WSGIServer):
+    """A WSGI server which handles requests in a fixed-size pool of threads.
+
+    Long-running requests, such as report downloads, no longer block polling or other tabs.
+    """
+
+    def __init__(self, *args, threads: int = 8, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="wsgi")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        # same as socketserver.ThreadingMixIn
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class WriteLock:
+    """WSGI middleware which handles requests that may write to the database one at a time.
+
+    SQLite allows a single writer; serializing writes in the application means concurrent writes
+    wait for each other instead of failing when the database busy timeout is exceeded. Responses
+    to writes are read while the lock is held, so streamed responses are buffered.
+    """
+
+    def __init__(self, app: Callable):
+        self.app = app
+        self.lock = Lock()
+
+    def __call__(self, environ: dict, start_response: Callable) -> Iterable[bytes]:
+        if environ["REQUEST_METHOD"] in SAFE_METHODS:
+            return self.app(environ, start_response)
+        with self.lock:
+            response = self.app(environ, start_response)
+            try:
+                return list(response)
+            finally:
+                if hasattr(response, "close"):
+                    response.close()
@@ -26,6 +26,11 @@ app.conf.beat_schedule = {
         "schedule": timedelta(minutes=60),
         "options": {"expires": timedelta(minutes=60).total_seconds()},
     },
+    "update-analytics": {
+        "task": "bmds_ui.analysis.tasks.update_analytics",
+        "schedule": timedelta(minutes=60),
+        "options": {"expires": timedelta(minutes=60).total_seconds()},
+    },
     "delete-bot-analyses": {
         "task": "bmds_ui.analysis.tasks.delete_bot_analyses",
         "schedule": timedelta(hours=12),
@@ -210,6 +210,62 @@ DJANGO_VITE = {
 DAYS_TO_KEEP_ANALYSES = int(os.environ.get("ANALYSIS_RETENTION_DAYS", "365"))
 DAYS_TO_KEEP_UNEXECUTED_ANALYSES = int(os.environ.get("UNEXECUTED_ANALYSIS_RETENTION_DAYS", "60"))
 DAYS_TO_KEEP_UNNAMED_CLONES = DAYS_TO_KEEP_UNEXECUTED_ANALYSES
+# number of rows deleted per transaction when removing expired analyses
+RETENTION_BATCH_SIZE = int(os.environ.get("RETENTION_BATCH_SIZE", "500"))
+# analysis fields not saved in revisions; a revision is only saved if other fields change, such as
+# inputs. Reverting an analysis restores inputs and clears results, which require re-execution;
+# the current deletion date is kept.
+ANALYSIS_REVISION_EXCLUDE = (
+    "outputs",
+    "errors",
+    "retained_sessions",
+    "started",
+    "ended",
+    "last_updated",
+    "deletion_date",
+)
+# maximum number of revisions kept for each object; 0 keeps all revisions
+REVISION_MAX_VERSIONS = int(os.environ.get("REVISION_MAX_VERSIONS", "20"))
+
+# number of processes used to execute dataset/option-set combinations; 1 executes serially
+ANALYSIS_EXECUTION_WORKERS = int(os.environ.get("ANALYSIS_EXECUTION_WORKERS", "1"))
+# fan out analyses with at least N combinations across celery workers; requires a result backend
+ANALYSIS_DISTRIBUTED_EXECUTION = bool(os.environ.get("ANALYSIS_DISTRIBUTED_EXECUTION") == "True")
+ANALYSIS_DISTRIBUTED_MIN_SESSIONS = int(os.environ.get("ANALYSIS_DISTRIBUTED_MIN_SESSIONS", "2"))
+# reuse sessions from the previous execution whose inputs are unchanged after an edit
+ANALYSIS_INCREMENTAL_EXECUTION = bool(os.environ.get("ANALYSIS_INCREMENTAL_EXECUTION") == "True")
+
+# compress saved session outputs; "zlib", "zstd" (requires zstandard), or blank for JSON
+ANALYSIS_OUTPUT_CODEC = os.environ.get("ANALYSIS_OUTPUT_CODEC", "")
+
+# generated reports; least recently used reports are removed when the maximum size is exceeded.
+# Reports are written by celery workers, so the path must be shared by web and worker processes.
+REPORT_STORE_PATH = Path(os.environ.get("REPORT_STORE_PATH", PUBLIC_DATA_ROOT / "reports"))
+REPORT_STORE_MAX_SIZE = int(os.environ.get("REPORT_STORE_MAX_SIZE_MB", "1024")) * 1024 * 1024
+# number of processes used to render figures for Word reports; 1 renders while writing the report
+REPORT_FIGURE_WORKERS = int(os.environ.get("REPORT_FIGURE_WORKERS", "1"))
+# generate reports with default options after an analysis is executed, before they're requested
+ANALYSIS_PREGENERATE_REPORTS = bool(os.environ.get("ANALYSIS_PREGENERATE_REPORTS") == "True")
+
+# content-addressed cache of modeling results; a redis URL or a directory path; blank to disable
+RESULT_CACHE_LOCATION = os.environ.get("RESULT_CACHE_LOCATION", "")
+RESULT_CACHE = None
+if RESULT_CACHE_LOCATION.startswith("redis"):
+    RESULT_CACHE = {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": RESULT_CACHE_LOCATION,
+        "OPTIONS": {"CLIENT_CLASS": "django_redis.client.DefaultClient"},
+        "TIMEOUT": 60 * 60 * 24 * 30,  # 30 days (in seconds)
+    }
+elif RESULT_CACHE_LOCATION:
+    RESULT_CACHE = {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": RESULT_CACHE_LOCATION,
+        "OPTIONS": {"MAX_ENTRIES": int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", "10000"))},
+        "TIMEOUT": 60 * 60 * 24 * 30,  # 30 days (in seconds)
+    }
+if RESULT_CACHE:
+    CACHES["results"] = RESULT_CACHE
 
 
 # commit information
@@ -249,4 +305,8 @@ INCLUDE_BETA_FEATURES = bool(os.environ.get("INCLUDE_BETA", "False") == "True")
 IS_DESKTOP = False
 IS_TESTING = False
 
-DB_VACUUM_INTERVAL_SECONDS = 600
+# SQLite maintenance is run when the database is idle for N seconds after writes, checked every
+# N seconds; each incremental vacuum frees at most N pages
+DB_MAINTENANCE_IDLE_SECONDS = 60
+DB_MAINTENANCE_INTERVAL_SECONDS = 30
+DB_MAINTENANCE_PAGES = 2000
@@ -16,6 +16,7 @@ PUBLIC_DATA_ROOT = APP_HOME / "public"
 LOGS_PATH = APP_HOME / "logs"
 STATIC_ROOT = PUBLIC_DATA_ROOT / "static"
 MEDIA_ROOT = PUBLIC_DATA_ROOT / "media"
+REPORT_STORE_PATH = PUBLIC_DATA_ROOT / "reports"
 
 PUBLIC_DATA_ROOT.mkdir(exist_ok=True, parents=False)
 LOGS_PATH.mkdir(exist_ok=True, parents=False)
@@ -29,18 +30,18 @@ CACHES = {
         "TIMEOUT": 60 * 10,  # 10 minutes (in seconds)
     }
 }
+if RESULT_CACHE:
+    CACHES["results"] = RESULT_CACHE
 
 DJANGO_VITE["default"]["manifest_path"] = str(STATIC_ROOT / "bundles" / "manifest.json")
 
-DB_VACUUM_INTERVAL_SECONDS = 120  # interval (in seconds)
-
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": os.getenv("BMDS_DB", APP_HOME / "bmds-desktop.db"),
         "OPTIONS": {
             "transaction_mode": "IMMEDIATE",
-            "init_command": "PRAGMA foreign_keys=ON; PRAGMA legacy_alter_table = OFF; PRAGMA journal_mode = WAL; PRAGMA synchronous = NORMAL; PRAGMA busy_timeout = 5000; PRAGMA temp_store = MEMORY; PRAGMA mmap_size = 134217728; PRAGMA journal_size_limit = 67108864; PRAGMA cache_size = 2000;",
+            "init_command": "PRAGMA auto_vacuum = INCREMENTAL; PRAGMA foreign_keys=ON; PRAGMA legacy_alter_table = OFF; PRAGMA journal_mode = WAL; PRAGMA synchronous = NORMAL; PRAGMA busy_timeout = 5000; PRAGMA temp_store = MEMORY; PRAGMA mmap_size = 134217728; PRAGMA journal_size_limit = 67108864; PRAGMA cache_size = 2000;",
         },
     }
 }
@@ -1,3 +1,5 @@
+import tempfile
+
 from ..constants import AuthProvider
 from .dev import *
 
@@ -11,6 +13,8 @@ SKIN = SkinStyle.Base
 DATABASES["default"]["NAME"] = "bmds-ui-test"
 DATABASES["default"]["TEST"] = {"NAME": "bmds-ui-test"}
 
+REPORT_STORE_PATH = Path(tempfile.gettempdir()) / "bmds-ui-test-reports"
+
 PASSWORD_HASHERS = ("django.contrib.auth.hashers.MD5PasswordHasher",)
 
 AUTH_PROVIDERS = {AuthProvider.django, AuthProvider.external}
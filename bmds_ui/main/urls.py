@@ -75,6 +75,11 @@ if settings.INCLUDE_ADMIN:
         # admin and custom admin login
         path(f"{admin_url}login/", common_views.AdminLoginView.as_view(), name="admin_login"),
         path(f"{admin_url}analytics/", views.Analytics.as_view(), name="analytics"),
+        path(
+            f"{admin_url}analytics/<slug:action>/",
+            views.Analytics.as_view(),
+            name="analytics_action",
+        ),
         path(admin_url, admin.site.urls),
     ]
 
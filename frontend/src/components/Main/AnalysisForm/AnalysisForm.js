@@ -73,7 +73,7 @@ class AnalysisForm extends Component {
                                     onClick={mainStore.executeResetAnalysis}
                                     text="Cancel"
                                 />
-                                <Spinner text="Executing, please wait..." />
+                                <Spinner text={mainStore.executionStatusText} />
                             </div>
                         ) : (
                             <div className="card-body">
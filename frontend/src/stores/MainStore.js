@@ -20,6 +20,7 @@ class MainStore {
     @observable errorMessage = null;
     @observable errorData = null;
     @observable executionOutputs = null;
+    @observable executionProgress = null;
     @observable isUpdateComplete = false;
 
     @action.bound setConfig(config) {
@@ -81,6 +82,14 @@ class MainStore {
         return this.model_type === "ND" || this.model_type === "MT";
     }
 
+    @computed get executionStatusText() {
+        const progress = this.executionProgress;
+        if (progress && progress.total > 0) {
+            return `Executing, ${progress.completed} of ${progress.total} complete...`;
+        }
+        return "Executing, please wait...";
+    }
+
     @action.bound
     async saveAnalysis() {
         this.rootStore.dataStore.cleanRows();
@@ -125,6 +134,7 @@ class MainStore {
             return;
         }
         this.isExecuting = true;
+        this.executionProgress = null;
         this.errorMessage = "";
 
         const apiUrl = this.config.apiUrl,
@@ -152,6 +162,7 @@ class MainStore {
                     })
                     .then(data => {
                         if (data.is_executing) {
+                            this.executionProgress = data.progress;
                             setTimeout(pollForResults, pollInterval);
                         } else {
                             this.updateModelStateFromApi(data);
@@ -405,15 +416,19 @@ class MainStore {
     @action.bound downloadReport(url) {
         let apiUrl = (apiUrl = this.config[url]),
             params = {},
+            headers = {},
             pollInterval = this.pollInterval;
         if (this.canEdit) {
-            params.editKey = this.config.editSettings.editKey;
+            // send in a header instead of the query string, so it is not saved in request logs
+            headers["X-Edit-Key"] = this.config.editSettings.editKey;
         }
         if (url === "wordUrl") {
             _.extend(params, toJS(this.wordReportOptions));
         }
         const fetchReport = () => {
-                fetch(apiUrl + "?" + new URLSearchParams(params).toString()).then(processResponse);
+                fetch(apiUrl + "?" + new URLSearchParams(params).toString(), {headers}).then(
+                    processResponse
+                );
             },
             processResponse = response => {
                 let contentType = response.headers.get("content-type");
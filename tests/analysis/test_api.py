@@ -1,13 +1,16 @@
 import json
+import zipfile
+from copy import deepcopy
 from io import BytesIO
 
 import docx
 import pandas as pd
 import pytest
 from django.urls import reverse
+from django.utils.timezone import now
 from rest_framework.test import APIClient
 
-from bmds_ui.analysis.models import Analysis
+from bmds_ui.analysis.models import Analysis, AnalysisSessionOutput
 from pybmds.recommender import RecommenderSettings
 
 
@@ -223,6 +226,40 @@ class TestAnalysisViewSet:
         assert response.data["has_errors"] is False
         assert bmd == pytest.approx(164.3, rel=0.05)
 
+    def test_incremental_execute(self, settings, complete_dichotomous):
+        settings.ANALYSIS_INCREMENTAL_EXECUTION = True
+        client = APIClient()
+        analysis = Analysis.objects.create(inputs=complete_dichotomous)
+        analysis.execute()
+        analysis.refresh_from_db()
+        original = analysis.get_outputs()["outputs"][0]
+        original_id = analysis.session_outputs.get().id
+
+        # add an option set; the existing session is retained
+        data = deepcopy(complete_dichotomous)
+        data["options"].append({**data["options"][0], "bmr_value": 0.05})
+        payload = {"editKey": analysis.password, "data": data}
+        response = client.patch(analysis.get_api_patch_inputs_url(), payload, format="json")
+        assert response.status_code == 200
+        assert response.data["outputs"] == {}
+        analysis.refresh_from_db()
+        assert len(analysis.retained_sessions) == 1
+        # only a pointer to the existing session row is retained, hidden from current results
+        assert list(analysis.retained_sessions.values()) == [original_id]
+        assert analysis.get_outputs() == {}
+
+        # only the new option set is executed
+        payload = {"editKey": analysis.password}
+        response = client.post(analysis.get_api_execute_url(), payload, format="json")
+        assert response.status_code == 200
+        first, second = response.data["outputs"]["outputs"]
+        assert first["cached"] is True
+        assert first["frequentist"] == original["frequentist"]
+        assert second["cached"] is False
+        analysis.refresh_from_db()
+        assert analysis.retained_sessions == {}
+        assert AnalysisSessionOutput.all_objects.filter(analysis=analysis).count() == 2
+
     def test_reset_execute(self, complete_dichotomous):
         client = APIClient()
         analysis = Analysis.objects.create(inputs=complete_dichotomous)
@@ -265,16 +302,30 @@ class TestAnalysisViewSet:
         payload["editKey"] = analysis.password
         response = client.post(url, payload, format="json")
         assert response.status_code == 200
-        value = response.data["outputs"]["outputs"][0]["frequentist"]["selected"]
+        assert response.data == payload["data"]
+        value = analysis.get_outputs()["outputs"][0]["frequentist"]["selected"]
         assert value == {"notes": "notes", "model_index": 0}
 
         # deselect model
         payload["data"]["selected"] = {"model_index": None, "notes": "no notes"}
         response = client.post(url, payload, format="json")
         assert response.status_code == 200
-        value = response.data["outputs"]["outputs"][0]["frequentist"]["selected"]
+        value = analysis.get_outputs()["outputs"][0]["frequentist"]["selected"]
         assert value == {"model_index": None, "notes": "no notes"}
 
+    def test_poll_progress(self, complete_dichotomous):
+        client = APIClient()
+        analysis = Analysis.objects.create(inputs=complete_dichotomous)
+        analysis.started = now()
+        analysis.save()
+        analysis.run_combinations([(0, 0)])
+
+        # sessions are not returned while executing
+        response = client.get(analysis.get_api_url())
+        assert response.data["is_executing"] is True
+        assert response.data["progress"] == {"completed": 1, "total": 1}
+        assert response.data["outputs"] is None
+
     @pytest.mark.parametrize("pk", analyses)
     def test_excel(self, pk):
         client = APIClient()
@@ -282,6 +333,41 @@ class TestAnalysisViewSet:
         url = reverse("api:analysis-excel", args=(analysis.id,))
         resp = client.get(url)
         assert resp.status_code == 200
+        if resp.streaming:
+            b"".join(resp.streaming_content)
+
+        # once generated, the report is streamed from the report store
+        resp = client.get(url)
+        assert resp.status_code == 200
+        assert resp.streaming
+        assert resp["Content-Disposition"].endswith('.xlsx"')
+        assert b"".join(resp.streaming_content).startswith(b"PK")
+
+    def test_tables(self):
+        client = APIClient()
+        analysis = Analysis.objects.get(pk="432a6083-f9aa-4de2-a71f-a6488b4c5bf1")
+        url = reverse("api:analysis-tables", args=(analysis.id,))
+
+        resp = client.get(url, {"format": "zip"})
+        assert resp.status_code == 200
+        with zipfile.ZipFile(BytesIO(resp.content)) as zf:
+            assert zf.namelist() == ["summary.csv", "datasets.csv", "parameters.csv"]
+            df = pd.read_csv(zf.open("summary.csv"))
+        assert df.shape[0] == analysis.to_df()["summary"].shape[0]
+
+    def test_tables_parquet(self):
+        pytest.importorskip("pyarrow")
+        client = APIClient()
+        analysis = Analysis.objects.get(pk="432a6083-f9aa-4de2-a71f-a6488b4c5bf1")
+        url = reverse("api:analysis-tables", args=(analysis.id,))
+
+        resp = client.get(url, {"format": "parquet", "table": "parameters"})
+        assert resp.status_code == 200
+        df = pd.read_parquet(BytesIO(resp.content))
+        assert df.shape[0] == analysis.to_df()["parameters"].shape[0]
+
+        resp = client.get(url, {"format": "parquet", "table": "foo"})
+        assert resp.status_code == 400
 
     @pytest.mark.parametrize("pk", analyses)
     def test_word(self, pk):
@@ -291,6 +377,24 @@ class TestAnalysisViewSet:
         resp = client.get(url)
         assert resp.status_code == 200
 
+    def test_word_edit(self):
+        client = APIClient()
+        analysis = Analysis.objects.get(pk="432a6083-f9aa-4de2-a71f-a6488b4c5bf1")
+        url = reverse("api:analysis-word", args=(analysis.id,))
+
+        def get_url_text(**headers) -> str:
+            client.get(url, headers=headers)  # queue report
+            resp = client.get(url, headers=headers)
+            assert resp.status_code == 200
+            document = docx.Document(BytesIO(resp.content))
+            p = next(p for p in document.paragraphs if p.text.startswith("Analysis URL"))
+            return p._p.xpath("string(.)")
+
+        # editors receive a report with a link to update the analysis
+        assert get_url_text() == "Analysis URL: View"
+        assert get_url_text(**{"X-Edit-Key": "invalid"}) == "Analysis URL: View"
+        assert get_url_text(**{"X-Edit-Key": analysis.password}) == "Analysis URL: View / Update"
+
     def test_star(self):
         client = APIClient()
         analysis = Analysis.objects.get(pk="cc3ca355-a57a-4fba-9dc3-99657562df68")
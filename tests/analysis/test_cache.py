@@ -0,0 +1,61 @@
+from copy import deepcopy
+
+import pytest
+
+from bmds_ui.analysis.cache import ResultCache, get_session_key
+from bmds_ui.analysis.models import Analysis
+
+
+@pytest.fixture
+def result_cache(settings):
+    settings.CACHES = {
+        **settings.CACHES,
+        "results": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    }
+    yield
+    ResultCache(inputs={}).cache.clear()
+
+
+def test_get_session_key(complete_dichotomous, bmds_complete_mt):
+    key = get_session_key(complete_dichotomous, 0, 0)
+    assert len(key) == 64
+
+    # names do not change the key
+    data = deepcopy(complete_dichotomous)
+    data["analysis_name"] = "new name"
+    assert get_session_key(data, 0, 0) == key
+
+    # positions do not change the key
+    data["options"].insert(0, {**data["options"][0], "bmr_value": 0.05})
+    assert get_session_key(data, 0, 1) == key
+    assert get_session_key(data, 0, 0) != key
+
+    # multitumor sessions use all enabled datasets
+    key = get_session_key(bmds_complete_mt, -1, 0)
+    data = deepcopy(bmds_complete_mt)
+    data["dataset_options"][2]["enabled"] = False
+    assert get_session_key(data, -1, 0) != key
+
+
+@pytest.mark.django_db
+class TestResultCache:
+    def test_disabled(self, complete_dichotomous):
+        cache = ResultCache(complete_dichotomous)
+        assert ResultCache.enabled() is False
+        assert cache.get(0, 0) is None
+
+    def test_execution(self, result_cache, complete_dichotomous):
+        analysis = Analysis.objects.create(inputs=complete_dichotomous)
+        analysis.execute()
+        assert analysis.get_outputs()["outputs"][0]["cached"] is False
+
+        # an identical combination in a new position is served from the cache
+        data = deepcopy(complete_dichotomous)
+        data["options"].insert(0, {**data["options"][0], "bmr_value": 0.05})
+        analysis2 = Analysis.objects.create(inputs=data)
+        analysis2.execute()
+        first, second = analysis2.get_outputs()["outputs"]
+        assert first["cached"] is False
+        assert second["cached"] is True
+        assert second["option_index"] == 1
+        assert second["frequentist"] == analysis.get_outputs()["outputs"][0]["frequentist"]
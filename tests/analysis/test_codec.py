@@ -0,0 +1,71 @@
+from importlib import import_module
+
+import pytest
+from django.apps import apps
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+
+from bmds_ui.analysis import codec
+from bmds_ui.analysis.models import Analysis, AnalysisSessionOutput
+
+
+def test_encode_decode():
+    data = {"a": [1.0, 2.5, None], "b": {"c": "d"}}
+    value = codec.encode(data, "zlib")
+    assert isinstance(value, bytes)
+    assert codec.decode(value, "zlib") == data
+
+    with pytest.raises(ImproperlyConfigured):
+        codec.encode(data, "gzip")
+
+
+def test_startup_check(settings):
+    settings.ANALYSIS_OUTPUT_CODEC = "gzip"
+    with pytest.raises(ImproperlyConfigured):
+        apps.get_app_config("analysis").ready()
+
+
+@pytest.mark.django_db
+class TestEncodedOutputs:
+    def test_execution(self, settings, complete_dichotomous):
+        settings.ANALYSIS_OUTPUT_CODEC = "zlib"
+        analysis = Analysis.objects.create(inputs=complete_dichotomous)
+        analysis.execute()
+
+        session_output = analysis.session_outputs.get()
+        assert session_output.codec == "zlib"
+        assert session_output.data == {}
+        outputs = analysis.get_outputs()
+        assert outputs["outputs"][0]["dataset_index"] == 0
+        assert analysis.get_session(0).frequentist is not None
+
+    def test_command(self, complete_dichotomous):
+        analysis = Analysis.objects.create(inputs=complete_dichotomous)
+        analysis.execute()
+        outputs = analysis.get_outputs()
+
+        call_command("encode_outputs", codec="zlib", batch_size=1)
+        assert AnalysisSessionOutput.objects.exclude(codec="zlib").count() == 0
+        assert analysis.get_outputs() == outputs
+
+        call_command("encode_outputs", codec="")
+        assert AnalysisSessionOutput.objects.exclude(codec="").count() == 0
+        assert analysis.get_outputs() == outputs
+
+        with pytest.raises(CommandError):
+            call_command("encode_outputs", codec="gzip")
+
+    def test_migration_reverse(self, complete_dichotomous):
+        analysis = Analysis.objects.create(inputs=complete_dichotomous)
+        analysis.execute()
+        outputs = analysis.get_outputs()
+        call_command("encode_outputs", codec="zlib")
+
+        # reversing the codec migration restores uncompressed data
+        migration = import_module("bmds_ui.analysis.migrations.0009_analysissessionoutput_codec")
+        migration.decode_sessions(apps, None)
+        session_output = AnalysisSessionOutput.objects.get(analysis=analysis)
+        assert session_output.codec == ""
+        assert session_output.encoded is None
+        assert session_output.data["dataset_index"] == 0
+        assert analysis.get_outputs() == outputs
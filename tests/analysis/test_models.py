@@ -1,13 +1,29 @@
+import os
+import shutil
+import time
+from copy import deepcopy
 from datetime import timedelta
 from pathlib import Path
 
+import billiard
+import docx
 import pandas as pd
 import pytest
+import reversion
 from django.conf import settings
 from django.db.models import F
+from django.utils.timezone import localdate, now
+from matplotlib.figure import Figure
+from reversion.models import Version
 
-from bmds_ui.analysis.models import Analysis
+from bmds_ui.analysis import executor, tasks
+from bmds_ui.analysis.models import Analysis, AnalysisSessionOutput, DailyAnalytics
+from bmds_ui.analysis.reporting import figures
 from bmds_ui.analysis.reporting.docx import build_docx
+from bmds_ui.analysis.reporting.figures import FigureCache
+from bmds_ui.analysis.schema import AnalysisSessionSchema
+from bmds_ui.analysis.validators import AnalysisSelectedSchema
+from pybmds.models.base import BmdModel
 
 
 def write_excel(data: dict, path: Path):
@@ -31,14 +47,22 @@ class TestAnalysis:
         a = Analysis.objects.get(id="cc3ca355-a57a-4fba-9dc3-99657562df68")
         assert str(a.timestamp) == "2021-12-15 18:42:49.109397+00:00"
 
-    def test_delete_old_analyses(self, analysis):
-        analysis.save()
-        Analysis.objects.filter(id=analysis.id).update(
+    def test_delete_old_analyses(self, analysis, settings):
+        settings.RETENTION_BATCH_SIZE = 1
+        clone = Analysis(inputs=analysis.default_input())
+        for item in [analysis, clone]:
+            with reversion.create_revision():
+                item.save()
+        Analysis.objects.filter(id__in=[analysis.id, clone.id]).update(
             deletion_date=F("created") - timedelta(days=1)
         )
-        assert Analysis.objects.filter(id=analysis.id).exists()
-        Analysis.delete_old_analyses()
-        assert Analysis.objects.filter(id=analysis.id).exists() is False
+        assert Version.objects.get_for_object(analysis).count() == 1
+        assert Analysis.delete_old_analyses() == 2
+        assert Analysis.objects.filter(id__in=[analysis.id, clone.id]).exists() is False
+
+        # reversion history is also removed
+        assert Version.objects.get_for_object(analysis).count() == 0
+        assert Version.objects.get_for_object(clone).count() == 0
 
     def test_delete_unexecuted_analyses(self, analysis):
         analysis.save()
@@ -69,6 +93,51 @@ class TestAnalysis:
         assert n_before - n_after == 1
         assert Analysis.objects.filter(id=analysis.id).exists() is False
 
+    def test_revisions(self, settings, complete_dichotomous):
+        settings.REVISION_MAX_VERSIONS = 2
+        analysis = Analysis(inputs=complete_dichotomous)
+        with reversion.create_revision():
+            analysis.save()
+        password = analysis.password
+
+        # changes to results are not saved
+        with reversion.create_revision():
+            analysis.execute()
+        assert analysis.session_outputs.count() == 1
+        versions = Version.objects.get_for_object(analysis)
+        assert versions.count() == 1
+        assert "outputs" not in versions[0].field_dict
+
+        # changes to inputs are saved, up to a maximum number of versions
+        for name in ["a", "b", "c"]:
+            with reversion.create_revision():
+                analysis.inputs["analysis_name"] = name
+                analysis.save()
+        versions = Version.objects.get_for_object(analysis)
+        assert [v.field_dict["inputs"]["analysis_name"] for v in versions] == ["c", "b"]
+
+        # reverting restores inputs and clears results, keeping the deletion date
+        Analysis.objects.filter(id=analysis.id).update(deletion_date=None)
+        last_updated = analysis.last_updated
+        versions[1].revision.revert()
+        analysis.refresh_from_db()
+        assert analysis.inputs["analysis_name"] == "b"
+        assert analysis.password == password
+        assert analysis.outputs == {} and analysis.started is None
+        assert analysis.retained_sessions == {}
+        assert analysis.deletion_date is None
+        assert analysis.last_updated > last_updated
+        assert AnalysisSessionOutput.all_objects.filter(analysis_id=analysis.id).count() == 0
+        assert analysis.get_outputs() == {}
+
+
+def run_pid(inputs: dict, dataset_index: int, option_index: int) -> AnalysisSessionSchema:
+    # executed in a process pool; returns the process id of the worker
+    time.sleep(0.5)
+    return AnalysisSessionSchema(
+        dataset_index=dataset_index, option_index=option_index, error=str(os.getpid())
+    )
+
 
 @pytest.mark.django_db()
 class TestExecution:
@@ -82,11 +151,11 @@ class TestExecution:
 
         assert analysis.is_finished is True
         assert analysis.has_errors is False
-        assert analysis.outputs["outputs"][0]["dataset_index"] == 0
-        assert analysis.outputs["outputs"][0]["option_index"] == 0
-        assert len(analysis.outputs["outputs"]) == 1
-        assert len(analysis.outputs["outputs"][0]["frequentist"]["models"]) == 1
-        assert len(analysis.outputs["outputs"][0]["bayesian"]["models"]) == 1
+        assert analysis.get_outputs()["outputs"][0]["dataset_index"] == 0
+        assert analysis.get_outputs()["outputs"][0]["option_index"] == 0
+        assert len(analysis.get_outputs()["outputs"]) == 1
+        assert len(analysis.get_outputs()["outputs"][0]["frequentist"]["models"]) == 1
+        assert len(analysis.get_outputs()["outputs"][0]["bayesian"]["models"]) == 1
         assert analysis.errors == []
 
         # test reporting (for completion)
@@ -110,11 +179,11 @@ class TestExecution:
 
         assert analysis.is_finished is True
         assert analysis.has_errors is False
-        assert analysis.outputs["outputs"][0]["dataset_index"] == 0
-        assert analysis.outputs["outputs"][0]["option_index"] == 0
-        assert len(analysis.outputs["outputs"]) == 1
-        assert len(analysis.outputs["outputs"][0]["frequentist"]["models"]) == 1
-        assert len(analysis.outputs["outputs"][0]["bayesian"]["models"]) == 1
+        assert analysis.get_outputs()["outputs"][0]["dataset_index"] == 0
+        assert analysis.get_outputs()["outputs"][0]["option_index"] == 0
+        assert len(analysis.get_outputs()["outputs"]) == 1
+        assert len(analysis.get_outputs()["outputs"][0]["frequentist"]["models"]) == 1
+        assert len(analysis.get_outputs()["outputs"][0]["bayesian"]["models"]) == 1
         assert analysis.errors == []
 
         # test reporting (for completion)
@@ -136,11 +205,11 @@ class TestExecution:
 
         assert analysis.is_finished is True
         assert analysis.has_errors is False
-        assert analysis.outputs["outputs"][0]["dataset_index"] == 0
-        assert analysis.outputs["outputs"][0]["option_index"] == 0
-        assert len(analysis.outputs["outputs"]) == 1
-        assert len(analysis.outputs["outputs"][0]["frequentist"]["models"]) == 1
-        assert len(analysis.outputs["outputs"][0]["bayesian"]["models"]) == 1
+        assert analysis.get_outputs()["outputs"][0]["dataset_index"] == 0
+        assert analysis.get_outputs()["outputs"][0]["option_index"] == 0
+        assert len(analysis.get_outputs()["outputs"]) == 1
+        assert len(analysis.get_outputs()["outputs"][0]["frequentist"]["models"]) == 1
+        assert len(analysis.get_outputs()["outputs"][0]["bayesian"]["models"]) == 1
         assert analysis.errors == []
 
         # test reporting (for completion)
@@ -162,11 +231,11 @@ class TestExecution:
 
         assert analysis.is_finished is True
         assert analysis.has_errors is False
-        assert analysis.outputs["outputs"][0]["dataset_index"] == 0
-        assert analysis.outputs["outputs"][0]["option_index"] == 0
-        assert len(analysis.outputs["outputs"]) == 1
-        assert len(analysis.outputs["outputs"][0]["frequentist"]["models"]) == 4
-        assert analysis.outputs["outputs"][0]["bayesian"] is None
+        assert analysis.get_outputs()["outputs"][0]["dataset_index"] == 0
+        assert analysis.get_outputs()["outputs"][0]["option_index"] == 0
+        assert len(analysis.get_outputs()["outputs"]) == 1
+        assert len(analysis.get_outputs()["outputs"][0]["frequentist"]["models"]) == 4
+        assert analysis.get_outputs()["outputs"][0]["bayesian"] is None
         assert analysis.errors == []
 
         # test reporting (for completion)
@@ -188,11 +257,11 @@ class TestExecution:
 
         assert analysis.is_finished is True
         assert analysis.has_errors is False
-        assert len(analysis.outputs["outputs"]) == 1
-        assert len(analysis.outputs["outputs"][0]["frequentist"]["results"]["models"]) == 3
-        assert len(analysis.outputs["outputs"][0]["frequentist"]["results"]["models"][0]) == 1
-        assert len(analysis.outputs["outputs"][0]["frequentist"]["results"]["models"][1]) == 4
-        assert analysis.outputs["outputs"][0]["bayesian"] is None
+        assert len(analysis.get_outputs()["outputs"]) == 1
+        assert len(analysis.get_outputs()["outputs"][0]["frequentist"]["results"]["models"]) == 3
+        assert len(analysis.get_outputs()["outputs"][0]["frequentist"]["results"]["models"][0]) == 1
+        assert len(analysis.get_outputs()["outputs"][0]["frequentist"]["results"]["models"][1]) == 4
+        assert analysis.get_outputs()["outputs"][0]["bayesian"] is None
         assert analysis.errors == []
 
         # test reporting (for completion)
@@ -203,3 +272,211 @@ class TestExecution:
         if rewrite_data_files:
             write_excel(df, data_path / "reports/multitumor.xlsx")
             (data_path / "reports/multitumor.docx").write_bytes(docx.getvalue())
+
+    def test_parallel(self, settings, complete_dichotomous):
+        settings.ANALYSIS_EXECUTION_WORKERS = 2
+        option = complete_dichotomous["options"][0]
+        complete_dichotomous["options"].append({**option, "bmr_type": 0})
+        complete_dichotomous["options"].append({**option, "bmr_type": 999})
+        analysis = Analysis.objects.create(inputs=complete_dichotomous)
+
+        analysis.execute()
+
+        # results are returned in order; errors are captured for each combination
+        outputs = analysis.get_outputs()["outputs"]
+        assert [output["option_index"] for output in outputs] == [0, 1, 2]
+        assert outputs[0]["error"] is None
+        assert outputs[1]["error"] is None
+        assert outputs[1]["frequentist"]["models"][0]["settings"]["bmr_type"] == 0
+        assert "999" in outputs[2]["error"]
+        assert len(analysis.errors) == 1
+
+    def test_parallel_daemon(self, monkeypatch, complete_dichotomous):
+        # a celery prefork worker is a daemonic billiard process; work is still split across a pool
+        monkeypatch.setattr(executor, "run", run_pid)
+        analysis = Analysis(inputs=complete_dichotomous)
+        context = billiard.get_context("fork")
+        queue = context.Queue()
+
+        def run():
+            try:
+                outputs = analysis.try_run_sessions_parallel(analysis.inputs, [(0, 0)] * 4, 2)
+                queue.put([output.error for output in outputs])
+            except Exception as exc:
+                queue.put(repr(exc))
+
+        process = context.Process(target=run, daemon=True)
+        process.start()
+        pids = queue.get(timeout=120)
+        process.join()
+        assert len(pids) == 4
+        assert len(set(pids)) == 2
+        assert str(process.pid) not in pids
+
+    def test_distributed(self, settings, monkeypatch, complete_dichotomous, bmds_complete_mt):
+        # the single-task execution path should not be used
+        monkeypatch.setattr(tasks.try_execute, "delay", None)
+        settings.ANALYSIS_DISTRIBUTED_EXECUTION = True
+        settings.ANALYSIS_DISTRIBUTED_MIN_SESSIONS = 1
+        option = complete_dichotomous["options"][0]
+        complete_dichotomous["options"].append({**option, "bmr_type": 0})
+        for inputs, expected in [
+            (complete_dichotomous, [(0, 0), (0, 1)]),
+            (bmds_complete_mt, [(-1, 0)]),
+        ]:
+            analysis = Analysis.objects.create(inputs=inputs)
+            assert analysis.get_combinations() == expected
+
+            analysis.start_execute()
+
+            analysis.refresh_from_db()
+            assert analysis.is_finished is True
+            assert analysis.has_errors is False
+            outputs = analysis.get_outputs()["outputs"]
+            assert [(d["dataset_index"], d["option_index"]) for d in outputs] == expected
+
+    def test_progress(self, complete_dichotomous):
+        option = complete_dichotomous["options"][0]
+        complete_dichotomous["options"].append({**option, "bmr_type": 0})
+        analysis = Analysis.objects.create(inputs=complete_dichotomous)
+        assert analysis.progress == {"completed": 0, "total": 0}
+
+        # sessions are saved as they complete
+        analysis.started = now()
+        analysis.save()
+        analysis.run_combinations([(0, 1)])
+        analysis.refresh_from_db()
+        assert analysis.progress == {"completed": 1, "total": 2}
+        assert analysis.get_outputs()["outputs"][0]["option_index"] == 1
+
+        # completed sessions are kept if execution fails
+        analysis.handle_execution_error("error")
+        analysis.refresh_from_db()
+        assert analysis.progress == {"completed": 1, "total": 2}
+        assert analysis.errors == "error"
+
+    def test_session_outputs(self, complete_dichotomous):
+        analysis = Analysis.objects.create(inputs=complete_dichotomous)
+        analysis.execute()
+        assert "outputs" not in analysis.outputs
+        assert analysis.session_outputs.count() == 1
+        outputs = analysis.get_outputs()
+        assert outputs["analysis_id"] == str(analysis.id)
+        assert outputs["outputs"][0]["dataset_index"] == 0
+
+        # sessions saved inline are still readable, and moved on update
+        analysis.session_outputs.all().delete()
+        analysis.outputs = deepcopy(outputs)
+        analysis.save()
+        assert analysis.get_outputs() == outputs
+        assert analysis.get_session(0).frequentist is not None
+        analysis.move_inline_outputs()
+        assert "outputs" not in analysis.outputs
+        assert analysis.get_outputs() == outputs
+
+        # sessions are removed on reset
+        analysis.reset_execution()
+        assert analysis.session_outputs.count() == 0
+        assert analysis.get_outputs() == {}
+
+    def test_iter_sessions(self, complete_dichotomous):
+        analysis = Analysis.objects.create(inputs=complete_dichotomous)
+        with pytest.raises(ValueError):
+            analysis.iter_sessions()
+
+        # sessions are deserialized as they are iterated
+        analysis.execute()
+        sessions = analysis.iter_sessions()
+        assert next(sessions).dataset_index == 0
+        assert next(sessions, None) is None
+        assert len(list(analysis.iter_batch_sessions())) == 2
+        assert len(analysis.to_batch().sessions) == 2
+
+    @pytest.mark.parametrize("codec", ["", "zlib"])
+    def test_update_selection(self, settings, codec, complete_dichotomous):
+        settings.ANALYSIS_OUTPUT_CODEC = codec
+        analysis = Analysis.objects.create(inputs=complete_dichotomous)
+        analysis.execute()
+
+        selection = AnalysisSelectedSchema(
+            dataset_index=0, option_index=0, selected={"model_index": 0, "notes": "notes"}
+        )
+        analysis.update_selection(selection)
+        session = analysis.get_session(0)
+        assert session.frequentist.selected.model_index == 0
+        assert session.frequentist.selected.notes == "notes"
+
+    def test_write_excel(self, tmp_path, complete_dichotomous, bmds_complete_mt):
+        for inputs in [complete_dichotomous, bmds_complete_mt]:
+            analysis = Analysis.objects.create(inputs=inputs)
+            analysis.execute()
+
+            # the streamed export matches the dataframe export
+            path = tmp_path / "streamed.xlsx"
+            analysis.write_excel(path)
+            write_excel(analysis.to_df(), tmp_path / "expected.xlsx")
+            streamed = pd.read_excel(path, sheet_name=None)
+            expected = pd.read_excel(tmp_path / "expected.xlsx", sheet_name=None)
+            assert list(streamed) == ["summary", "datasets", "parameters"]
+            for name, df in expected.items():
+                pd.testing.assert_frame_equal(streamed[name], df)
+
+    def test_docx_figures(self, settings, monkeypatch, tmp_path, complete_dichotomous):
+        settings.REPORT_STORE_PATH = tmp_path
+        analysis = Analysis.objects.create(inputs=complete_dichotomous)
+        analysis.execute()
+        original_plot = BmdModel.plot
+
+        def get_images(docx_file) -> list[bytes]:
+            document = docx.Document(docx_file)
+            rels = document.part.rels.values()
+            return [rel.target_part.blob for rel in rels if "image" in rel.reltype]
+
+        # figures are cached when a report is written
+        figure_cache = FigureCache.build_default()
+        images = get_images(build_docx(analysis, "", all_models=True, figure_cache=figure_cache))
+        assert len(list((tmp_path / "figures").iterdir())) == len(images)
+
+        # pybmds is only patched while a report is written
+        assert BmdModel.plot is original_plot
+
+        # figures are rendered in a process pool, and reused by other report variants
+        shutil.rmtree(tmp_path / "figures")
+        pool_cache = FigureCache(figure_cache.store, max_workers=2)
+        with monkeypatch.context() as m:
+            # daemonic processes cannot start a pool; figures are rendered with the report
+            m.setattr(figures, "can_start_processes", lambda: False)
+            pool_cache.prerender(analysis, {"all_models": True})
+            assert not (tmp_path / "figures").exists()
+        pool_cache.prerender(analysis, {"all_models": True})
+        assert len(list((tmp_path / "figures").iterdir())) == len(images)
+        monkeypatch.setattr(Figure, "savefig", None)
+        images2 = get_images(
+            build_docx(
+                analysis, "", dataset_format_long=False, all_models=True, figure_cache=figure_cache
+            )
+        )
+        assert images2 == images
+
+
+@pytest.mark.django_db()
+class TestDailyAnalytics:
+    def test_update_all(self, complete_dichotomous):
+        # all days are summarized initially
+        n_days = Analysis.objects.dates("created", "day").count()
+        assert DailyAnalytics.update_all() == n_days
+        assert sum(DailyAnalytics.objects.values_list("n_created", flat=True)) == (
+            Analysis.objects.count()
+        )
+
+        # only days with changes are updated
+        assert DailyAnalytics.update_all() == 0
+        analysis = Analysis.objects.create(inputs=complete_dichotomous)
+        analysis.execute()
+        assert DailyAnalytics.update_all() == 1
+        day = DailyAnalytics.objects.latest()
+        assert day.date == localdate(analysis.created)
+        assert day.n_created >= day.n_completed >= 1
+        assert day.dataset_options["1,1"] >= 1
+        assert day.dtypes["D"] >= 1
+        assert day.dichotomous_models["yes,yes"] >= 1
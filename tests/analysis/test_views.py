@@ -5,7 +5,8 @@ from django.urls import reverse
 from django.utils.timezone import now
 from pytest_django.asserts import assertTemplateNotUsed, assertTemplateUsed
 
-from bmds_ui.analysis.models import Analysis, Collection
+from bmds_ui.analysis.models import Analysis, Collection, DailyAnalytics
+from bmds_ui.analysis.reporting.analytics import PANELS, get_cached_panel
 from bmds_ui.analysis.views import Analytics, DesktopHome, Home, get_analysis_or_404
 
 
@@ -105,6 +106,17 @@ class TestAnalysisClone:
         assert str(analysis.id) != str(analysis2.id)
         assert analysis2.inputs["analysis_name"] == f"{analysis.inputs['analysis_name']} (clone)"
 
+    def test_session_outputs(self, complete_dichotomous):
+        client = Client()
+        analysis = Analysis.objects.create(inputs=complete_dichotomous)
+        analysis.execute()
+
+        response = client.get(analysis.get_clone_url(), follow=True)
+
+        analysis2 = response.context["object"]
+        assert analysis2.session_outputs.count() == 1
+        assert analysis2.get_outputs() == analysis.get_outputs()
+
 
 @pytest.mark.django_db
 class TestAnalysisRenew:
@@ -146,6 +158,31 @@ class TestAnalytics:
         assert resp.status_code == 200
         assertTemplateUsed(resp, template)
 
+    def test_panels(self):
+        client = Client()
+        assert client.login(username="admin@bmdsonline.org", password="pw") is True
+        url = reverse("analytics_action", args=("panel",))
+
+        # panels are pending until daily rollups are computed
+        resp = client.get(f"{url}?name=summary", headers={"HX-Request": "true"})
+        assertTemplateUsed(resp, "analysis/fragments/analytics_pending.html")
+
+        # each panel is loaded separately
+        DailyAnalytics.update_all()
+        for name in PANELS:
+            resp = client.get(f"{url}?name={name}", headers={"HX-Request": "true"})
+            assert resp.status_code == 200
+            assertTemplateUsed(resp, f"analysis/fragments/analytics_{name}.html")
+
+        resp = client.get(f"{url}?name=runtime")
+        assert resp.status_code == 400
+        resp = client.get(f"{url}?name=invalid", headers={"HX-Request": "true"})
+        assert resp.status_code == 404
+
+        # figures are cached as JSON
+        panel = get_cached_panel("time_series")
+        assert isinstance(panel["fig_per_day"], str)
+
 
 @pytest.mark.django_db
 class TestHome:
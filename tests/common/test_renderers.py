@@ -1,6 +1,8 @@
+import zipfile
 from io import BytesIO
 
 import pandas as pd
+import pytest
 from docx import Document
 from rest_framework.response import Response
 
@@ -53,3 +55,36 @@ class TestExcelRenderer:
         data = renderers.XlsxRenderer().render(data=error, renderer_context={"response": resp})
         df2 = pd.read_excel(BytesIO(data))
         assert df2.Status[0] == '"{\\n  \\"test\\": \\"here\\"\\n}"'
+
+
+class TestTableRenderers:
+    def test_csv_zip(self):
+        df = pd.DataFrame(data=[[1, 2.5, True], [4, "-", "-"]], columns=["a", "b", "c"])
+        data = renderers.DataFrames(data={"one": df, "two": df}, filename="test")
+
+        resp = Response()
+        b = renderers.CsvZipRenderer().render(data=data, renderer_context={"response": resp})
+        assert resp["Content-Disposition"] == 'attachment; filename="test.zip"'
+        with zipfile.ZipFile(BytesIO(b)) as zf:
+            assert zf.namelist() == ["one.csv", "two.csv"]
+            df2 = pd.read_csv(zf.open("one.csv"))
+        # placeholders for missing values are removed
+        assert df2.b.isna().tolist() == [False, True]
+
+    def test_csv_zip_error(self):
+        resp = Response()
+        b = renderers.CsvZipRenderer().render(data={"a": 1}, renderer_context={"response": resp})
+        assert resp["Content-Disposition"] == 'attachment; filename="error.zip"'
+        with zipfile.ZipFile(BytesIO(b)) as zf:
+            assert zf.namelist() == ["error.csv"]
+
+    def test_parquet(self):
+        pytest.importorskip("pyarrow")
+        df = pd.DataFrame(data=[[1, 2.5, True], [4, "-", "-"]], columns=["a", "b", "c"])
+        data = renderers.DataFrames(data={"one": df}, filename="test")
+
+        resp = Response()
+        b = renderers.ParquetRenderer().render(data=data, renderer_context={"response": resp})
+        assert resp["Content-Disposition"] == 'attachment; filename="test.parquet"'
+        df2 = pd.read_parquet(BytesIO(b))
+        assert df2.b.dtype == float
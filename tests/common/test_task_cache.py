@@ -0,0 +1,183 @@
+import os
+from io import BytesIO
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from bmds_ui.analysis.models import Analysis
+from bmds_ui.analysis.reporting.cache import DocxReportCache, ExcelReportCache
+from bmds_ui.common.renderers import DocxRenderer
+from bmds_ui.common.task_cache import ReportStatus, ReportStore
+
+
+class TestReportStore:
+    def test_get_set(self, tmp_path):
+        store = ReportStore(path=tmp_path / "reports", max_size=100)
+        assert store.get("a") is None
+        store.set("a", BytesIO(b"123"))
+        assert store.get("a").getvalue() == b"123"
+
+    def test_temporary_path(self, tmp_path):
+        store = ReportStore(path=tmp_path, max_size=100)
+        path = store.temporary_path()
+        path.write_bytes(b"123")
+        store.set("a", path)
+        assert not path.exists()
+        with store.open("a") as f:
+            assert f.read() == b"123"
+        assert store.open("b") is None
+
+    def test_evict(self, tmp_path):
+        store = ReportStore(path=tmp_path, max_size=100)
+        store.set("a", BytesIO(b"0" * 40))
+        store.set("b", BytesIO(b"0" * 40))
+        os.utime(tmp_path / "a", (0, 0))
+        os.utime(tmp_path / "b", (1, 1))
+
+        # reading a report marks it as recently used
+        assert store.get("a") is not None
+
+        # least recently used reports are removed
+        store.set("c", BytesIO(b"0" * 40))
+        assert store.get("a") is not None
+        assert store.get("b") is None
+        assert store.get("c") is not None
+
+
+@pytest.mark.django_db
+class TestReportCache:
+    def test_request_content(self, settings, tmp_path, monkeypatch):
+        settings.REPORT_STORE_PATH = tmp_path
+        analysis = Analysis.objects.get(pk="432a6083-f9aa-4de2-a71f-a6488b4c5bf1")
+        cache = ExcelReportCache(analysis=analysis)
+        cache.delete()
+
+        # first request generates the report (celery is eager during tests)
+        assert cache.request_content().status is ReportStatus.QUEUED
+        response = cache.request_content()
+        assert response.status is ReportStatus.COMPLETE
+        assert len(list(tmp_path.iterdir())) == 1
+
+        # later requests, including after the status is cleared, are served from the store
+        monkeypatch.setattr(ExcelReportCache, "create", None)
+        content = response.content.read()
+        response2 = cache.request_content()
+        assert response2.content.read() == content
+        cache.delete()
+        response3 = cache.request_content()
+        assert response3.content.read() == content
+        for item in [response, response2, response3]:
+            item.content.close()
+
+    def test_content_key(self, django_assert_num_queries):
+        analysis = Analysis.objects.get(pk="432a6083-f9aa-4de2-a71f-a6488b4c5bf1")
+        cache = ExcelReportCache(analysis=analysis)
+
+        # the key is computed without loading results, and changes when the analysis is updated
+        with django_assert_num_queries(0):
+            key = cache.content_key()
+        assert DocxReportCache(analysis=analysis).content_key() != key
+        analysis.save()
+        assert cache.content_key() != key
+
+    def test_variants(self, settings, tmp_path, monkeypatch):
+        settings.REPORT_STORE_PATH = tmp_path
+        analysis = Analysis.objects.get(pk="432a6083-f9aa-4de2-a71f-a6488b4c5bf1")
+        tasks = []
+        monkeypatch.setattr(DocxReportCache, "invoke_celery_task", lambda self: tasks.append(self))
+        long = DocxReportCache(analysis=analysis, uri="", dataset_format_long=True)
+        wide = DocxReportCache(analysis=analysis, uri="", dataset_format_long=False)
+        long.delete()
+
+        # each variant is queued once
+        for cache in [long, wide, long, wide]:
+            assert cache.request_content().status is ReportStatus.QUEUED
+        assert len(tasks) == 2
+
+        # each variant is returned
+        for cache in tasks:
+            cache.create_content()
+        assert long.cache_key != wide.cache_key
+        long_content = long.request_content().content.getvalue()
+        wide_content = wide.request_content().content.getvalue()
+        assert long_content != wide_content
+
+        # all variants are cleared together
+        long.delete()
+        assert long.cache.get(long.cache_key) is None
+        assert wide.cache.get(wide.cache_key) is None
+
+    def test_single_flight(self, settings, tmp_path, monkeypatch):
+        settings.REPORT_STORE_PATH = tmp_path
+        analysis = Analysis.objects.get(pk="432a6083-f9aa-4de2-a71f-a6488b4c5bf1")
+        tasks = []
+        monkeypatch.setattr(ExcelReportCache, "invoke_celery_task", lambda self: tasks.append(self))
+        first = ExcelReportCache(analysis=analysis)
+        first.delete()
+
+        # concurrent requests from separate workers queue a single task
+        assert first.claim(first.cache_key) is True
+        assert ExcelReportCache(analysis=analysis).request_content().status is ReportStatus.QUEUED
+        assert len(tasks) == 0
+        first.release(first.cache_key)
+        assert ExcelReportCache(analysis=analysis).request_content().status is ReportStatus.QUEUED
+        assert ExcelReportCache(analysis=analysis).request_content().status is ReportStatus.QUEUED
+        assert len(tasks) == 1
+
+        # the status is updated while generating, and a duplicate pregeneration is skipped
+        statuses = []
+
+        def create(self):
+            statuses.append(self.request_content().status)
+            self.pregenerate()
+            return BytesIO(b"123")
+
+        monkeypatch.setattr(ExcelReportCache, "create", create)
+        tasks[0].create_content()
+        assert statuses == [ReportStatus.GENERATING]
+        with first.request_content().content as f:
+            assert f.read() == b"123"
+
+    def test_create_error(self, settings, tmp_path, monkeypatch):
+        settings.REPORT_STORE_PATH = tmp_path
+        analysis = Analysis.objects.get(pk="432a6083-f9aa-4de2-a71f-a6488b4c5bf1")
+        tasks = []
+        monkeypatch.setattr(ExcelReportCache, "invoke_celery_task", lambda self: tasks.append(self))
+        cache = ExcelReportCache(analysis=analysis)
+        cache.delete()
+        assert cache.request_content().status is ReportStatus.QUEUED
+
+        def create(self):
+            raise ValueError("failed")
+
+        # a failure releases the claim and returns an error status
+        monkeypatch.setattr(ExcelReportCache, "create", create)
+        with pytest.raises(ValueError):
+            tasks[0].create_content()
+        assert cache.request_content().status is ReportStatus.ERROR
+        assert cache.claim(cache.cache_key) is True
+        cache.release(cache.cache_key)
+        cache.delete()
+
+    def test_pregenerate(self, settings, tmp_path, django_capture_on_commit_callbacks):
+        settings.REPORT_STORE_PATH = tmp_path
+        settings.ANALYSIS_PREGENERATE_REPORTS = True
+        analysis = Analysis.objects.get(pk="432a6083-f9aa-4de2-a71f-a6488b4c5bf1")
+        analysis.id = None
+        analysis.save()
+        with django_capture_on_commit_callbacks(execute=True):
+            analysis.execute()
+
+        # reports with default options are available on the first request
+        excel = ExcelReportCache(analysis=analysis)
+        response = excel.request_content()
+        assert response.status is ReportStatus.COMPLETE
+        response.content.close()
+
+        # the word report requested by the editor, with default options, is also available
+        url = reverse("api:analysis-word", args=(analysis.id,))
+        params = {"datasetFormatLong": "true", "allModels": "false", "bmdCdfTable": "false"}
+        response = APIClient().get(url, params, headers={"X-Edit-Key": analysis.password})
+        assert response.status_code == 200
+        assert response["Content-Type"].startswith(DocxRenderer.media_type)
@@ -0,0 +1,100 @@
+import time
+
+import pytest
+from django.core.cache import cache
+
+from bmds_ui.common import tasks, utils
+from bmds_ui.common.utils import timeout_cache
+
+
+@timeout_cache("test-lock", 60)
+def cached_value():
+    return 1
+
+
+class TestTimeoutCache:
+    def test_keys(self):
+        calls = []
+
+        @timeout_cache("test-keys", 60)
+        def add(a, b=0):
+            calls.append((a, b))
+            return a + b
+
+        cache.delete_many(["test-keys", "test-keys-lock"])
+        assert add(1) == 1
+        assert add(1) == 1
+        assert add(1, b=2) == 3
+        assert calls == [(1, 0), (1, 2)]
+
+        # invalidation only removes the result for the given arguments
+        add.invalidate(1)
+        assert add(1) == 1
+        assert add(1, b=2) == 3
+        assert calls == [(1, 0), (1, 2), (1, 0)]
+        add.invalidate(1)
+        add.invalidate(1, b=2)
+
+    def test_stale_while_revalidate(self, monkeypatch):
+        calls = []
+        refreshes = []
+
+        @timeout_cache("test-stale", 60)
+        def func():
+            calls.append(1)
+            return len(calls)
+
+        monkeypatch.setattr(tasks.refresh_timeout_cache, "delay", lambda *a: refreshes.append(a))
+        func.invalidate()
+        assert func() == 1
+
+        # a stale result is returned, and a single refresh is queued
+        now = time.time()
+        monkeypatch.setattr(time, "time", lambda: now + 61)
+        assert func() == 1
+        assert func() == 1
+        assert len(refreshes) == 1
+        name, args, kwargs, token = refreshes[0]
+        assert name.endswith(".func")
+        assert func.refresh(args, kwargs, token) == 2
+        assert func() == 2
+        assert len(refreshes) == 1
+
+        # the lock is released after a refresh, even if it fails
+        monkeypatch.setattr(time, "time", lambda: now + 150)
+        assert func() == 2
+        calls.append(None)
+        monkeypatch.setattr(utils.cache, "set", None)
+        with pytest.raises(TypeError):
+            func.refresh(*refreshes[1][1:])
+        assert cache.get("test-stale-lock") is None
+        monkeypatch.undo()
+        func.invalidate()
+
+    def test_lock(self):
+        cache.delete_many(["test-lock", "test-lock-lock"])
+
+        # a lock claimed by another caller is not released by a refresh
+        cache.set("test-lock-lock", "other")
+        assert cached_value.refresh([], {}, "expired") == 1
+        assert cache.get("test-lock-lock") == "other"
+
+        # callers waiting for a result time out rather than computing it without the lock
+        cached_value.invalidate()
+
+        @timeout_cache("test-lock", 60, lock_timeout=0)
+        def func():
+            return 1
+
+        with pytest.raises(TimeoutError):
+            func()
+        cache.delete("test-lock-lock")
+
+    def test_refresh_task(self):
+        # stale results are refreshed by a celery task, which imports the function by name
+        cached_value.invalidate()
+        cache.set("test-lock-lock", "token")
+        tasks.refresh_timeout_cache("tests.common.test_utils.cached_value", [], {}, "token")
+        assert cache.get("test-lock")["data"] == 1
+        assert cache.get("test-lock-lock") is None
+        cached_value.invalidate()
@@ -1,9 +1,7 @@
-from datetime import timedelta
+import time
 
 import pytest
-from django.conf import settings
-from django.core.cache import cache
-from django.utils import timezone
+from django.db import connection
 
 from bmds_ui.common import vacuum
 
@@ -16,31 +14,38 @@ def test_is_sqlite(settings):
     assert vacuum.is_sqlite() is False
 
 
-def test_should_vacuum():
-    # vacuum if cache is unset
-    vacuum.clear_vacuum_cache()
-    assert vacuum.should_vacuum() is True
+def test_is_idle(monkeypatch):
+    # not idle if there have been no writes
+    monkeypatch.setattr(vacuum, "_last_write", None)
+    assert vacuum.is_idle(60) is False
 
-    # vacuum if last cache was older than threshold
-    now = timezone.now()
-    last_vacuum = (now - timedelta(seconds=settings.DB_VACUUM_INTERVAL_SECONDS + 30)).isoformat()
-    cache.set(vacuum.VACUUM_TIMESTAMP_CACHE_KEY, last_vacuum)
-    assert vacuum.should_vacuum() is True
-
-    # vacuum if last cache was newer than threshold
-    last_vacuum = (now - timedelta(seconds=settings.DB_VACUUM_INTERVAL_SECONDS - 30)).isoformat()
-    cache.set(vacuum.VACUUM_TIMESTAMP_CACHE_KEY, last_vacuum)
-    assert vacuum.should_vacuum() is False
+    # idle if the last write was older than threshold
+    vacuum.record_write()
+    assert vacuum.is_idle(60) is False
+    monkeypatch.setattr(vacuum, "_last_write", time.monotonic() - 61)
+    assert vacuum.is_idle(60) is True
 
 
 @pytest.mark.django_db(transaction=True)
 def test_vacuum(settings):
-    vacuum.clear_vacuum_cache()
-
     settings.DATABASES["default"]["ENGINE"] = "django.db.backends.postgresql"
     assert vacuum.vacuum() is False
-    assert cache.get(vacuum.VACUUM_TIMESTAMP_CACHE_KEY) is None
 
     settings.DATABASES["default"]["ENGINE"] = "django.db.backends.sqlite3"
     assert vacuum.vacuum() is True
-    assert cache.get(vacuum.VACUUM_TIMESTAMP_CACHE_KEY) is not None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_maintain(settings):
+    settings.DATABASES["default"]["ENGINE"] = "django.db.backends.postgresql"
+    assert vacuum.maintain(100) is False
+
+    if connection.vendor != "sqlite":
+        pytest.skip("requires sqlite")
+    settings.DATABASES["default"]["ENGINE"] = "django.db.backends.sqlite3"
+    vacuum.record_write()
+    assert vacuum.maintain(100) is True
+    assert vacuum.is_idle(0) is False
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA auto_vacuum")
+        assert cursor.fetchone()[0] == vacuum.AUTO_VACUUM_INCREMENTAL
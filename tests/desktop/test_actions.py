@@ -47,3 +47,21 @@ def test_create_shortcut(capsys):
     actions.create_shortcut(no_input=True)
     captured = capsys.readouterr()
     assert "BMDS Desktop Manager Created" in captured.out
+
+
+@pytest.mark.django_db
+def test_sync_persistent_data(settings, tmp_path, monkeypatch):
+    settings.STATIC_ROOT = tmp_path
+    commands = []
+    monkeypatch.setattr(actions, "call_command", lambda name, **kw: commands.append(name))
+
+    # static files are collected once; migrations are only run if unapplied
+    actions.sync_persistent_data()
+    actions.sync_persistent_data()
+    assert commands == ["collectstatic"]
+
+    # static files are collected again if changed
+    (tmp_path / ".fingerprint").write_text("changed")
+    monkeypatch.setattr(actions, "has_unapplied_migrations", lambda: True)
+    actions.sync_persistent_data()
+    assert commands == ["collectstatic", "collectstatic", "migrate"]
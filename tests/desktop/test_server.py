@@ -0,0 +1,70 @@
+import time
+from functools import partial
+from threading import Event, Thread
+from urllib.request import Request, urlopen
+from wsgiref.simple_server import make_server
+
+from bmds_ui.desktop.server import PooledWSGIServer, WriteLock
+
+
+def fetch(url: str, method: str = "GET") -> bytes:
+    request = Request(url, data=b"" if method == "POST" else None, method=method)  # noqa: S310
+    with urlopen(request, timeout=10) as resp:  # noqa: S310
+        return resp.read()
+
+
+def test_pooled_server():
+    release = Event()
+    release_write = Event()
+    writing = Event()
+    active = []
+    max_active = []
+    responses = []
+
+    def app(environ, start_response):
+        if environ["PATH_INFO"] == "/slow":
+            release.wait(timeout=10)
+        if environ["REQUEST_METHOD"] == "POST":
+            active.append(1)
+            max_active.append(len(active))
+            writing.set()
+            if environ["PATH_INFO"] == "/write-slow":
+                release_write.wait(timeout=10)
+            active.pop()
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [environ["PATH_INFO"].encode()]
+
+    def fetch_write(url: str):
+        responses.append(fetch(url, method="POST"))
+
+    server = make_server(
+        "127.0.0.1", 0, WriteLock(app), server_class=partial(PooledWSGIServer, threads=4)
+    )
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        # a slow request does not block other requests
+        slow = Thread(target=fetch, args=(f"{url}/slow",))
+        slow.start()
+        assert fetch(f"{url}/fast") == b"/fast"
+        release.set()
+        slow.join()
+
+        # overlapping writes are handled one at a time, while reads are not blocked
+        first = Thread(target=fetch_write, args=(f"{url}/write-slow",))
+        first.start()
+        assert writing.wait(timeout=10)
+        second = Thread(target=fetch_write, args=(f"{url}/write",))
+        second.start()
+        assert fetch(f"{url}/read") == b"/read"
+        time.sleep(0.2)  # the second write is waiting for the first
+        assert max_active == [1]
+        release_write.set()
+        first.join()
+        second.join()
+        assert max_active == [1, 1]
+        assert sorted(responses) == [b"/write", b"/write-slow"]
+    finally:
+        server.shutdown()
+        server.server_close()